@@ -2,6 +2,7 @@ import os
 import sys
 import time
 import signal
+import logging
 import psutil
 import uvicorn
 import argparse
@@ -9,6 +10,8 @@ import asyncio
 import aiohttp
 import json
 import platform
+import subprocess
+import importlib.util
 from datetime import datetime
 
 # 添加src目录到Python路径
@@ -103,21 +106,42 @@ async def test_api_endpoints(host, port):
     
     return test_results
 
+def get_workers(pid):
+    """获取主进程下的 worker 进程（不含 multiprocessing 的 resource_tracker）"""
+    workers = []
+    try:
+        children = psutil.Process(pid).children()
+    except psutil.Error:
+        return workers
+    for child in children:
+        try:
+            if not any('resource_tracker' in arg for arg in child.cmdline()):
+                workers.append(child)
+        except psutil.Error:
+            pass
+    return workers
+
 def stop_service():
     """停止服务"""
     pid = get_pid()
     if pid:
         try:
+            # 生产模式下主进程收到信号后会等待 worker 处理完当前请求
+            try:
+                children = psutil.Process(pid).children(recursive=True)
+            except psutil.Error:
+                children = []
+            graceful_timeout = ConfigManager().get_server_config().get('graceful_timeout', 30) if get_workers(pid) else 0
             if platform.system() == "Windows":
-                # Windows使用taskkill命令
-                os.system(f"taskkill /PID {pid} /F")
+                # Windows使用taskkill命令，/T 同时结束子进程
+                os.system(f"taskkill /PID {pid} /T /F")
             else:
                 # Linux/Unix使用信号
                 os.kill(pid, signal.SIGTERM)
             
             logger.info("正在停止服务...")
             # 等待进程结束
-            for _ in range(10):
+            for _ in range(int((graceful_timeout + 5) * 2)):
                 if not is_service_running():
                     break
                 time.sleep(0.5)
@@ -129,6 +153,12 @@ def stop_service():
                         logger.warning("服务未响应，强制终止")
                     except:
                         pass
+            # 主进程被强制结束时 worker 可能残留
+            for child in children:
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
             logger.info("服务已停止")
         except (ProcessLookupError, OSError):
             logger.warning("服务进程不存在")
@@ -138,7 +168,103 @@ def stop_service():
         except:
             pass
 
-def start_service(config):
+def get_worker_count(server_config):
+    """worker 数量：配置为0时按可用CPU核数"""
+    workers = server_config.get('workers', 0)
+    if workers:
+        return workers
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def detect_loop_and_http():
+    """选择可用的最快事件循环和HTTP解析器"""
+    loop = "uvloop" if platform.system() != "Windows" and importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return loop, http
+
+def build_worker_class(loop, http):
+    """gunicorn 使用的 uvicorn worker，日志交给应用自己的日志配置"""
+    try:
+        from uvicorn_worker import UvicornWorker
+    except ImportError:
+        from uvicorn.workers import UvicornWorker
+    
+    class SumbotWorker(UvicornWorker):
+        CONFIG_KWARGS = {"loop": loop, "http": http, "log_config": None}
+        
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            for name in ["uvicorn.error", "uvicorn.access"]:
+                uvicorn_logger = logging.getLogger(name)
+                uvicorn_logger.handlers = []
+                uvicorn_logger.propagate = True
+    
+    return SumbotWorker
+
+def run_gunicorn(host, port, workers, loop, http, server_config):
+    """使用 gunicorn 主进程管理 worker，预加载应用后 fork，worker 共享已导入的模块"""
+    from gunicorn.app.base import BaseApplication
+    
+    class ProductionApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "worker_class": build_worker_class(loop, http),
+                "preload_app": server_config.get('preload', True),
+                "backlog": server_config.get('backlog', 2048),
+                "keepalive": server_config.get('keepalive', 5),
+                "timeout": server_config.get('timeout', 120),
+                "graceful_timeout": server_config.get('graceful_timeout', 30),
+                "max_requests": server_config.get('max_requests', 0),
+                "max_requests_jitter": server_config.get('max_requests_jitter', 0),
+                "proc_name": "sumbot",
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+        
+        def load(self):
+            from src.main import app
+            return app
+    
+    ProductionApplication().run()
+
+def start_production(host, port, server_config, workers=None):
+    """
+    生产模式：多 worker、无文件监视
+    安装了 gunicorn 时由其预加载应用后 fork worker，否则使用 uvicorn 自带的多进程模式（每个 worker 单独加载应用）
+    """
+    workers = workers or get_worker_count(server_config)
+    loop, http = detect_loop_and_http()
+    use_gunicorn = platform.system() != "Windows" and importlib.util.find_spec("gunicorn") is not None
+    logger.info(
+        f"生产模式: {workers} 个 worker, 事件循环 {loop}, HTTP解析器 {http}, "
+        f"进程管理 {'gunicorn' if use_gunicorn else 'uvicorn'}"
+    )
+    
+    if use_gunicorn:
+        run_gunicorn(host, port, workers, loop, http, server_config)
+        return
+    
+    if server_config.get('preload', True):
+        logger.warning("未安装 gunicorn，无法预加载应用，各 worker 单独加载")
+    uvicorn.run(
+        "src.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=server_config.get('backlog', 2048),
+        timeout_keep_alive=server_config.get('keepalive', 5),
+        timeout_graceful_shutdown=server_config.get('graceful_timeout', 30),
+        limit_max_requests=server_config.get('max_requests') or None,
+        log_config=None
+    )
+
+def start_service(config, production=False, workers=None):
     """启动服务"""
     if is_service_running():
         logger.warning("服务已在运行中")
@@ -160,6 +286,10 @@ def start_service(config):
     logger.info(f"启动服务: http://{host}:{port}")
     logger.info(f"API文档: http://{host}:{port}/docs")
     
+    if production:
+        start_production(host, port, ConfigManager().get_server_config(), workers)
+        return
+    
     # 启动服务
     uvicorn.run(
         "src.main:app",
@@ -170,12 +300,12 @@ def start_service(config):
         log_config=None  # 使用我们自定义的日志配置
     )
 
-def restart_service(config):
+def restart_service(config, production=False, workers=None):
     """重启服务"""
     logger.info("开始重启服务...")
     stop_service()
     time.sleep(1)  # 等待服务完全停止
-    start_service(config)
+    start_service(config, production, workers)
 
 async def show_status():
     """显示服务状态"""
@@ -190,6 +320,19 @@ async def show_status():
         logger.info(f"CPU使用率: {process.cpu_percent()}%")
         logger.info(f"内存使用: {process.memory_info().rss / 1024 / 1024:.1f} MB")
         
+        # 生产模式下的 worker 进程
+        workers = get_workers(pid)
+        if workers:
+            logger.info(f"Worker 数量: {len(workers)}")
+            for worker in workers:
+                try:
+                    logger.info(
+                        f"  Worker {worker.pid}: CPU {worker.cpu_percent(interval=0.1)}%, "
+                        f"内存 {worker.memory_info().rss / 1024 / 1024:.1f} MB"
+                    )
+                except psutil.Error:
+                    pass
+        
         # 获取配置
         config = ConfigManager()
         api_config = config.get_api_config()
@@ -239,24 +382,63 @@ def set_ai_service(service_name: str = None, api_key: str = None):
                 else:
                     raise ValueError("API密钥必须以 'sk-' 开头")
         
-        # 保存更新后的配置
+        # 保存更新后的配置：先写临时文件再替换，运行中的服务不会读到写了一半的文件
         config_data['ai_service'] = ai_config
-        with open(config_file, 'w', encoding='utf-8') as f:
+        tmp_file = f"{config_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(config_data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, config_file)
         
+        if is_service_running():
+            if ConfigManager().get_config_reload_config().get('watch', True):
+                logger.info("运行中的服务会自动重新加载配置")
+            else:
+                logger.info("运行中的服务收到 SIGHUP 后重新加载配置")
         return True
     except Exception as e:
         logger.error(f"更新配置失败: {str(e)}")
         return False
 
+def export_history(date: str = None):
+    """从历史数据库重新生成按日期的 Markdown 历史文件"""
+    from src.utils.history_store import history_store
+    
+    paths = history_store.export_markdown(date=date)
+    if paths:
+        for path in paths:
+            logger.info(f"已导出历史记录: {path}")
+    else:
+        logger.warning("没有可导出的历史记录")
+
+def profile_startup(module="src.main", top=20, group=False, budget_ms=None, budget_mb=None):
+    """
+    在独立进程中导入应用，报告各模块的导入耗时和内存增量
+    :return: 进程退出码，超出预算时非零
+    """
+    command = [sys.executable, "-m", "src.utils.startup_profiler", module, "--top", str(top)]
+    if group:
+        command.append("--group")
+    if budget_ms is not None:
+        command += ["--budget-ms", str(budget_ms)]
+    if budget_mb is not None:
+        command += ["--budget-mb", str(budget_mb)]
+    return subprocess.run(command, cwd=ROOT_DIR).returncode
+
 if __name__ == "__main__":
     # 解析命令行参数
     parser = argparse.ArgumentParser(description="SumBot服务管理")
     parser.add_argument('action', nargs='?', default='start',
-                       choices=['start', 'stop', 'restart', 'status', 'set'],
-                       help='执行的操作: start, stop, restart, status, set')
+                       choices=['start', 'stop', 'restart', 'status', 'set', 'export-history', 'profile-startup'],
+                       help='执行的操作: start, stop, restart, status, set, export-history, profile-startup')
     parser.add_argument('--service', help='设置默认AI服务')
     parser.add_argument('--api-key', help='设置API密钥')
+    parser.add_argument('--date', help='导出历史记录的日期（YYYYMMDD），不指定时导出全部')
+    parser.add_argument('--production', action='store_true', help='生产模式：多 worker 运行，不监视文件变化')
+    parser.add_argument('--workers', type=int, help='生产模式的 worker 数量，默认使用配置或CPU核数')
+    parser.add_argument('--top', type=int, default=20, help='启动分析显示开销最大的前N项')
+    parser.add_argument('--group', action='store_true', help='启动分析按顶层包汇总')
+    parser.add_argument('--budget-ms', type=float, help='启动分析的导入耗时预算（毫秒）')
+    parser.add_argument('--budget-mb', type=float, help='启动分析的常驻内存预算（MB）')
     args = parser.parse_args()
     
     # 加载配置
@@ -271,13 +453,19 @@ if __name__ == "__main__":
             else:
                 set_ai_service(args.service, args.api_key)
         elif args.action == 'start':
-            start_service(api_config)
+            start_service(api_config, args.production, args.workers)
         elif args.action == 'stop':
             stop_service()
         elif args.action == 'restart':
-            restart_service(api_config)
+            restart_service(api_config, args.production, args.workers)
         elif args.action == 'status':
             asyncio.run(show_status())
+        elif args.action == 'export-history':
+            export_history(args.date)
+        elif args.action == 'profile-startup':
+            sys.exit(profile_startup(
+                top=args.top, group=args.group, budget_ms=args.budget_ms, budget_mb=args.budget_mb
+            ))
     except KeyboardInterrupt:
         logger.warning("操作被用户中断")
     except Exception as e:
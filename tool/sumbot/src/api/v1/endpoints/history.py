@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+from src.schemas.history import HistoryRecord, HistoryExportResponse
+from src.utils.api_auth import verify_admin_access
+from src.utils.config_manager import ConfigManager
+from src.utils.history_store import history_store
+from src.utils.logger import get_logger
+
+def require_history_access(request: Request) -> None:
+    """历史记录包含所有提交的URL和请求ID，查询和导出都需要管理令牌或本机访问"""
+    verify_admin_access(request, ConfigManager().get_history_config().get('access_token'))
+
+router = APIRouter(
+    prefix="/api/v1/history",
+    tags=["history"],
+    dependencies=[Depends(require_history_access)]
+)
+
+logger = get_logger("sumbot.api.history")
+
+@router.get("", response_model=List[HistoryRecord])
+async def query_history(
+    url: Optional[str] = None,
+    tag: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    min_latency_ms: Optional[float] = None,
+    summary_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """
+    查询URL处理历史，按时间倒序
+    """
+    return await asyncio.to_thread(
+        history_store.query,
+        url=url,
+        tag=tag,
+        start=start.timestamp() if start else None,
+        end=end.timestamp() if end else None,
+        min_latency_ms=min_latency_ms,
+        summary_id=summary_id,
+        status=status,
+        limit=limit,
+        offset=offset
+    )
+
+@router.post("/export", response_model=HistoryExportResponse)
+async def export_history(date: Optional[str] = None):
+    """
+    从历史数据库重新生成按日期的 Markdown 历史文件
+    """
+    if date:
+        try:
+            datetime.strptime(date, "%Y%m%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="日期格式应为 YYYYMMDD")
+    files = await asyncio.to_thread(history_store.export_markdown, date=date)
+    logger.info(f"已导出 {len(files)} 个历史文件")
+    return HistoryExportResponse(files=files)
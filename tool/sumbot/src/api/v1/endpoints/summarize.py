@@ -1,12 +1,16 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Request
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, Optional
 from src.schemas.summarize import (
     URLSummarizeRequest,
     URLSummarizeResponse,
+    BatchSummarizeRequest,
+    BatchSummarizeItemResult,
     SearchSummarizeRequest,
     SearchSummarizeResponse
 )
 from src.services.summarize import SummarizeService
+from src.utils.config_manager import ConfigManager
 from src.utils.logger import get_logger
 import json
 
@@ -24,18 +28,10 @@ async def summarize_url(request: URLSummarizeRequest, req: Request):
     总结URL内容
     """
     try:
-        # 记录详细的请求信息
-        logger.info("收到URL总结请求:")
-        logger.info(f"URL: {request.url}")
-        logger.info(f"标签: {request.tags}")
-        logger.info(f"最大长度: {request.max_length}")
-        logger.info(f"客户端IP: {req.client.host}")
-        logger.info(f"请求方法: {req.method}")
-        logger.info(f"请求路径: {req.url.path}")
-        
-        # 记录请求头
-        headers = dict(req.headers)
-        logger.info(f"请求头: {json.dumps(headers, ensure_ascii=False)}")
+        logger.info(
+            "收到URL总结请求",
+            extra={"fields": {"url": str(request.url), "tags": request.tags, "client_ip": req.client.host if req.client else None}}
+        )
         
         # 将HttpUrl转换为字符串
         url_str = str(request.url)
@@ -45,20 +41,92 @@ async def summarize_url(request: URLSummarizeRequest, req: Request):
             summary=result["summary"],
             source_url=result["source_url"]
         )
+    except HTTPException as e:
+        logger.error(f"URL总结失败: HTTP {e.status_code}: {e.detail}")
+        raise
     except Exception as e:
-        logger.error(f"URL总结失败: {str(e)}")
-        logger.error(f"错误类型: {type(e).__name__}")
-        logger.error(f"错误详情: {str(e)}")
+        logger.error(f"URL总结失败: {type(e).__name__}: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/file")
-async def summarize_file(file: UploadFile = File(...)):
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """格式化为 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/url/stream")
+async def summarize_url_stream(request: URLSummarizeRequest):
+    """
+    流式总结URL内容（Server-Sent Events）
+    事件依次为 progress（抓取/提取进度）、token（模型增量文本）、result（完整的 URLSummarizeResponse）或 error
+    """
+    logger.info(f"收到URL流式总结请求: {request.url}")
+    
+    async def event_stream() -> AsyncIterator[str]:
+        async for event, data in summarize_service.summarize_url_stream(
+            str(request.url), request.api_key, request.tags
+        ):
+            if event == "result":
+                data = URLSummarizeResponse(**data).model_dump(mode="json")
+            yield _format_sse(event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.post("/batch")
+async def summarize_batch(request: BatchSummarizeRequest):
+    """
+    批量总结URL内容
+    以 NDJSON 按完成顺序逐行返回每一项的结果，单项失败不影响整个批次
+    """
+    max_items = ConfigManager().get_batch_config().get('max_items', 200)
+    if not request.items:
+        raise HTTPException(status_code=400, detail="批量请求不能为空")
+    if len(request.items) > max_items:
+        raise HTTPException(status_code=400, detail=f"批量请求最多 {max_items} 项")
+    
+    logger.info(f"收到批量总结请求: {len(request.items)} 项")
+    items = [
+        {"url": str(item.url), "api_key": item.api_key, "tags": item.tags}
+        for item in request.items
+    ]
+    
+    async def result_stream() -> AsyncIterator[str]:
+        async for result in summarize_service.summarize_batch(items):
+            yield BatchSummarizeItemResult(**result).model_dump_json() + "\n"
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+# 上传内容直接从请求体流式解析，不经过 UploadFile 暂存；这里只声明请求体格式供 OpenAPI 文档使用
+FILE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+@router.post("/file", openapi_extra=FILE_UPLOAD_BODY)
+async def summarize_file(request: Request):
     """
     总结文件内容
     """
     try:
-        result = await summarize_service.summarize_file(file)
+        result = await summarize_service.summarize_upload(request)
         return {"summary": result}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -1,11 +1,26 @@
+import asyncio
+import math
 import os
+import signal
 import sys
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.v1.endpoints.summarize import router as summarize_router
-from utils.config_manager import ConfigManager
-from utils.logger import get_logger
+from src.api.v1.endpoints.history import router as history_router
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger, redact, should_sample, truncate
+from src.utils.http_client import startup_http_session, close_http_session
+from src.utils.ai_client_registry import client_registry
+from src.utils.task_executor import task_executor
+from src.utils.metrics import registry as metrics_registry
+from src.utils.tracing import trace_store, current_request_id
+from src.utils.api_auth import verify_admin_access
+from src.utils.history_store import history_store
+from src.utils.rate_limiter import rate_limiter
+from src.utils.redis_client import close_redis_client
+from src.utils.provider_router import current_route
 import time
 import json
 
@@ -26,43 +41,128 @@ app = FastAPI(
     version=api_config.get('version', 'v1')
 )
 
+# 添加限流中间件（在日志中间件内层，被拒绝的请求也会记录日志）
+@app.middleware("http")
+async def rate_limit_requests(request: Request, call_next):
+    allowed, remaining, retry_after = await rate_limiter.check(request)
+    if not allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "请求过于频繁，请稍后重试"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    return await call_next(request)
+
 # 添加日志中间件
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     # 记录请求开始
     start_time = time.time()
+    sampled = should_sample(request.url.path)
     
-    # 记录请求体
-    body = await request.body()
-    if body:
-        try:
-            body_str = body.decode()
-            if request.headers.get('content-type') == 'application/json':
-                body_json = json.loads(body_str)
-                logger.info(f"请求体: {json.dumps(body_json, ensure_ascii=False)}")
-            else:
-                logger.info(f"请求体: {body_str}")
-        except Exception as e:
-            logger.error(f"解析请求体失败: {str(e)}")
-    
-    # 记录请求头
-    headers = dict(request.headers)
-    logger.info(f"请求头: {json.dumps(headers, ensure_ascii=False)}")
+    # 只在采样时读取JSON请求体，避免缓冲上传文件；密钥字段脱敏并截断
+    body_str = None
+    if sampled and request.headers.get('content-type', '').startswith('application/json'):
+        body = await request.body()
+        if body:
+            try:
+                body_str = json.dumps(redact(json.loads(body)), ensure_ascii=False)
+            except Exception:
+                body_str = body.decode(errors='replace')
+            body_str = truncate(body_str)
     
     response = await call_next(request)
     
     # 计算处理时间
     process_time = (time.time() - start_time) * 1000
     
-    # 记录请求信息
-    logger.info(
-        f"{request.client.host}:{request.client.port} - "
-        f"\"{request.method} {request.url.path} HTTP/{request.scope.get('http_version', '1.1')}\" "
-        f"{response.status_code} - {process_time:.2f}ms"
-    )
+    # 未采样的请求只在出错时记录
+    if sampled or response.status_code >= 400:
+        fields = {
+            "request_id": current_request_id(),
+            "client": f"{request.client.host}:{request.client.port}" if request.client else None,
+            "method": request.method,
+            "path": request.url.path,
+            "http_version": request.scope.get('http_version', '1.1'),
+            "status": response.status_code,
+            "duration_ms": round(process_time, 2),
+        }
+        if sampled:
+            fields["headers"] = redact(dict(request.headers))
+            if body_str:
+                fields["body"] = body_str
+        logger.info(
+            f"\"{request.method} {request.url.path}\" {response.status_code} - {process_time:.2f}ms",
+            extra={"fields": fields}
+        )
+    
+    return response
+
+# 添加追踪中间件（在日志中间件外层，日志中可以带上请求ID）
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    current_route.set(request.url.path)
+    if not trace_store.enabled:
+        return await call_next(request)
+    
+    trace = trace_store.start(request.headers.get('x-request-id'), request.method, request.url.path)
+    try:
+        response = await call_next(request)
+    except Exception:
+        trace_store.finish(trace, 500)
+        raise
+    
+    # 流式响应的响应头先于后续阶段发出，Server-Timing 只包含此前已完成的阶段
+    response.headers['X-Request-ID'] = trace.request_id
+    response.headers['Server-Timing'] = trace.server_timing()
+    
+    # 响应体发送完毕后再结束追踪，流式响应的阶段树也是完整的
+    body_iterator = response.body_iterator
+    
+    async def finish_after_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            trace_store.finish(trace, response.status_code)
     
+    response.body_iterator = finish_after_body()
     return response
 
+def reload_on_signal() -> None:
+    """收到 SIGHUP 时重新加载配置，保留任务引用避免被回收"""
+    app.state.config_reload = asyncio.get_running_loop().create_task(config.reload_async())
+
+@app.on_event("startup")
+async def on_startup():
+    """创建进程级共享资源"""
+    await startup_http_session()
+    
+    # 配置文件修改或收到 SIGHUP 时重新加载配置，不需要重启服务
+    reload_config = config.get_config_reload_config()
+    if reload_config.get('watch', True):
+        app.state.config_watcher = asyncio.create_task(config.watch(reload_config.get('interval', 2)))
+    if hasattr(signal, 'SIGHUP'):
+        loop = asyncio.get_running_loop()
+        try:
+            # 信号处理函数在事件循环线程中执行，订阅方同样在事件循环中更新状态
+            loop.add_signal_handler(signal.SIGHUP, reload_on_signal)
+        except (RuntimeError, ValueError, NotImplementedError):
+            # 非主线程的事件循环无法注册信号处理
+            logger.debug("未注册 SIGHUP 配置重新加载")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """释放进程级共享资源"""
+    config_watcher = getattr(app.state, 'config_watcher', None)
+    if config_watcher is not None:
+        config_watcher.cancel()
+    await close_http_session()
+    await client_registry.close_all()
+    await close_redis_client()
+    task_executor.shutdown()
+    await asyncio.to_thread(history_store.close)
+
 # 配置 CORS
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +174,7 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(summarize_router)
+app.include_router(history_router)
 
 @app.get("/")
 async def root():
@@ -84,4 +185,36 @@ async def root():
         "message": f"欢迎使用 {api_config.get('name', 'SumBot')} API",
         "docs_url": "/docs",
         "redoc_url": "/redoc"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus 文本格式的进程内指标
+    """
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+def require_debug_access(request: Request) -> None:
+    """调试端点访问控制，见 verify_admin_access"""
+    verify_admin_access(request, config.get_tracing_config().get('debug_token'))
+
+if config.get_tracing_config().get('debug_endpoint', False):
+    @app.get("/debug/traces", include_in_schema=False, dependencies=[Depends(require_debug_access)])
+    async def list_traces(limit: int = 50):
+        """
+        最近请求的追踪概要
+        """
+        return trace_store.recent(limit)
+
+    @app.get("/debug/traces/{request_id}", include_in_schema=False, dependencies=[Depends(require_debug_access)])
+    async def get_trace(request_id: str):
+        """
+        单个请求的完整阶段树
+        """
+        trace = trace_store.get(request_id)
+        if trace is None:
+            raise HTTPException(status_code=404, detail="未找到该请求的追踪记录")
+        return trace.to_dict()
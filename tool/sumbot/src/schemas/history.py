@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class HistoryRecord(BaseModel):
+    url: str
+    tags: List[str] = []
+    created_at: float
+    latency_ms: Optional[float] = None
+    summary_id: Optional[str] = None
+    status: str
+    request_id: Optional[str] = None
+
+class HistoryExportResponse(BaseModel):
+    files: List[str]
@@ -21,6 +21,16 @@ class URLSummarizeResponse(BaseModel):
     summary: str
     source_url: Optional[HttpUrl] = None
     
+class BatchSummarizeRequest(BaseModel):
+    items: List[URLSummarizeRequest]
+
+class BatchSummarizeItemResult(BaseModel):
+    index: int
+    status: str
+    summary: Optional[str] = None
+    source_url: Optional[str] = None
+    detail: Optional[str] = None
+
 class SearchSummarizeRequest(BaseModel):
     query: str
     max_results: Optional[int] = 5
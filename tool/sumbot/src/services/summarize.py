@@ -1,17 +1,43 @@
-from fastapi import UploadFile, HTTPException
-from src.utils.file_processor import FileProcessor
+import asyncio
+import os
+import time
+from contextlib import nullcontext
+from fastapi import Request, UploadFile, HTTPException
+from src.utils.file_processor import FileProcessor, extract_file_content
 from src.utils.ai_service import AIService
 from src.utils.url_processor import URLProcessor
-from typing import List, Optional, Dict, Any
+from src.utils.summary_cache import SummaryCache, canonicalize_url, hash_content
+from src.utils.single_flight import SingleFlight
+from src.utils.ai_client_registry import hash_api_key
+from src.utils.config_manager import ConfigManager
+from src.utils.upload_handler import SpooledUpload, spool_request_upload, spool_upload
+from src.utils.task_executor import task_executor
+from src.utils.tracing import span
+from src.utils.metrics import EXTRACTION_SECONDS, CONTENT_LENGTH, CACHE_LOOKUPS, ERRORS, IN_FLIGHT
+from typing import AsyncContextManager, AsyncIterator, List, Optional, Dict, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 class SummarizeService:
     def __init__(self):
+        self.config = ConfigManager()
         self.file_processor = FileProcessor()
         self.ai_service = AIService()
         self.url_processor = URLProcessor()
+        self.cache = SummaryCache()
+        self.single_flight = SingleFlight()
+    
+    async def _get_cached(self, key: str, kind: str) -> Optional[Dict[str, Any]]:
+        """
+        查询总结缓存并记录命中情况
+        :param key: 缓存键
+        :param kind: 缓存类型（url 或 content）
+        """
+        with span("cache", kind=kind):
+            cached = await self.cache.get(key)
+        CACHE_LOOKUPS.inc(kind=kind, result="hit" if cached else "miss")
+        return cached
     
     async def summarize_url(self, url: str, api_key: Optional[str] = None, tags: Optional[List[str]] = None) -> Dict[str, Any]:
         """
@@ -22,32 +48,238 @@ class SummarizeService:
         :return: 包含总结和原URL的字典
         """
         try:
-            # 获取 URL 内容
-            content = await self.url_processor.get_url_content(url, tags)
-            
-            # 验证内容
-            if not content or not content.strip():
-                raise HTTPException(
-                    status_code=400,
-                    detail="URL内容为空"
+            with IN_FLIGHT.track(endpoint="url"):
+                return await self._summarize_url(url, api_key, tags)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail=f"URL内容总结失败: {str(e)}"
+            )
+    
+    async def _summarize_url(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        fetch_limit: Optional[asyncio.Semaphore] = None,
+        llm_limit: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """
+        合并规范化URL和参数都相同的并发请求，只执行一次抓取和模型调用
+        :param fetch_limit: 可选的抓取并发限制
+        :param llm_limit: 可选的模型调用并发限制
+        """
+        key = (
+            canonicalize_url(url),
+            hash_api_key(api_key) if api_key else None,
+            tuple(tags or ())
+        )
+        start = time.perf_counter()
+        try:
+            result = await self.single_flight.do(
+                key,
+                lambda: self._run_summarize_url(url, api_key, tags, fetch_limit, llm_limit)
+            )
+        except Exception:
+            await self.url_processor.record_url_history(
+                url, tags, (time.perf_counter() - start) * 1000, status="error"
+            )
+            raise
+        
+        # 合并的请求各自记录历史；写入在后台进行，不影响响应时间
+        await self.url_processor.record_url_history(
+            url, tags, (time.perf_counter() - start) * 1000, result["summary_id"],
+            "cache_hit" if result["cache_hit"] else "success"
+        )
+        return {"summary": result["summary"], "source_url": url}
+    
+    async def _run_summarize_url(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        fetch_limit: Optional[asyncio.Semaphore] = None,
+        llm_limit: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """
+        URL总结流程
+        :param fetch_limit: 可选的抓取并发限制
+        :param llm_limit: 可选的模型调用并发限制
+        """
+        # 命中URL缓存时跳过抓取和模型调用
+        url_key = self.cache.url_key(url)
+        cached = await self._get_cached(url_key, "url")
+        if cached:
+            logger.info(f"命中URL总结缓存: {url}")
+            return {
+                "summary": cached["summary"],
+                "source_url": url,
+                "summary_id": cached.get("content_hash"),
+                "cache_hit": True
+            }
+        
+        # 获取 URL 内容，其他 worker 已提取过的正文直接复用
+        content = await self.cache.get_text(url)
+        if content is None:
+            async with fetch_limit or nullcontext():
+                content = await self.url_processor.get_url_content(url, tags)
+            if content and content.strip():
+                await self.cache.set_text(url, content)
+        
+        # 验证内容
+        if not content or not content.strip():
+            raise HTTPException(
+                status_code=400,
+                detail="URL内容为空"
+            )
+        
+        # 记录内容长度
+        logger.info(f"获取到URL内容，长度: {len(content)} 字符")
+        logger.debug(f"内容前100个字符: {content[:100]}")
+        
+        # 内容相同的页面复用已有总结
+        content_hash = hash_content(content)
+        content_key = self.cache.content_key(content_hash)
+        cached = await self._get_cached(content_key, "content")
+        if cached:
+            logger.info(f"命中内容总结缓存: {content_hash[:12]}")
+            summary = cached["summary"]
+        else:
+            # 使用 AI 服务生成总结
+            async with llm_limit or nullcontext():
+                summary = await self.ai_service.generate_summary(content, api_key)
+            await self.cache.set(content_key, {"summary": summary})
+        
+        await self.cache.set(url_key, {
+            "summary": summary,
+            "content_hash": content_hash
+        })
+        
+        return {
+            "summary": summary,
+            "source_url": url,
+            "summary_id": content_hash,
+            "cache_hit": False
+        }
+    
+    async def summarize_batch(self, items: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        批量总结 URL，按完成顺序产出每一项的结果
+        单项失败只影响该项，不影响整个批次
+        :param items: 请求项列表，每项包含 url、api_key、tags
+        """
+        batch_config = self.config.get_batch_config()
+        fetch_limit = asyncio.Semaphore(batch_config.get('fetch_concurrency', 16))
+        llm_limit = asyncio.Semaphore(batch_config.get('llm_concurrency', 4))
+        
+        async def run(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            url = item["url"]
+            try:
+                result = await self._summarize_url(
+                    url, item.get("api_key"), item.get("tags"), fetch_limit, llm_limit
                 )
+                return {"index": index, "status": "success", **result}
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"批量总结第 {index} 项失败: {detail}")
+                return {
+                    "index": index,
+                    "status": "error",
+                    "source_url": url,
+                    "detail": f"URL内容总结失败: {detail}"
+                }
+        
+        tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+        try:
+            with IN_FLIGHT.track(endpoint="batch"):
+                for future in asyncio.as_completed(tasks):
+                    yield await future
+        finally:
+            # 客户端中途断开时取消剩余任务
+            for task in tasks:
+                task.cancel()
+    
+    async def summarize_url_stream(
+        self,
+        url: str,
+        api_key: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式总结 URL 内容
+        依次产出 (事件名, 数据)：progress 阶段进度、token 模型增量文本、result 最终结果、error 错误
+        :param url: 要总结的URL
+        :param api_key: 可选的API密钥
+        :param tags: 可选的标签列表
+        """
+        IN_FLIGHT.inc(endpoint="url_stream")
+        start = time.perf_counter()
+        try:
+            url_key = self.cache.url_key(url)
+            cached = await self._get_cached(url_key, "url")
+            if cached:
+                logger.info(f"命中URL总结缓存: {url}")
+                await self.url_processor.record_url_history(
+                    url, tags, (time.perf_counter() - start) * 1000, cached.get("content_hash"), "cache_hit"
+                )
+                yield "progress", {"stage": "cache", "status": "hit"}
+                yield "result", {"summary": cached["summary"], "source_url": url}
+                return
             
-            # 记录内容长度
+            content = await self.cache.get_text(url)
+            if content is not None:
+                yield "progress", {"stage": "extract", "status": "cached", "length": len(content)}
+            else:
+                yield "progress", {"stage": "fetch", "status": "start"}
+                html = await self.url_processor.fetch_html(url)
+                yield "progress", {"stage": "fetch", "status": "done", "bytes": len(html)}
+                
+                yield "progress", {"stage": "extract", "status": "start"}
+                content = await self.url_processor.extract_text(html, url)
+                if not content or not content.strip():
+                    raise HTTPException(
+                        status_code=400,
+                        detail="URL内容为空"
+                    )
+                yield "progress", {"stage": "extract", "status": "done", "length": len(content)}
+                await self.cache.set_text(url, content)
             logger.info(f"获取到URL内容，长度: {len(content)} 字符")
-            logger.debug(f"内容前100个字符: {content[:100]}")
             
-            # 使用 AI 服务生成总结
-            summary = await self.ai_service.generate_summary(content, api_key)
+            content_hash = hash_content(content)
+            content_key = self.cache.content_key(content_hash)
+            cached = await self._get_cached(content_key, "content")
+            if cached:
+                logger.info(f"命中内容总结缓存: {content_hash[:12]}")
+                summary = cached["summary"]
+            else:
+                yield "progress", {"stage": "summarize", "status": "start"}
+                parts = []
+                async for token in self.ai_service.generate_summary_stream(content, api_key):
+                    parts.append(token)
+                    yield "token", {"text": token}
+                summary = "".join(parts).strip()
+                await self.cache.set(content_key, {"summary": summary})
             
-            return {
+            await self.cache.set(url_key, {
                 "summary": summary,
-                "source_url": url
-            }
+                "content_hash": content_hash
+            })
+            
+            await self.url_processor.record_url_history(
+                url, tags, (time.perf_counter() - start) * 1000, content_hash
+            )
+            yield "result", {"summary": summary, "source_url": url}
         except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"URL内容总结失败: {str(e)}"
+            await self.url_processor.record_url_history(
+                url, tags, (time.perf_counter() - start) * 1000, status="error"
             )
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"URL流式总结失败: {detail}")
+            yield "error", {"detail": f"URL内容总结失败: {detail}"}
+        finally:
+            IN_FLIGHT.dec(endpoint="url_stream")
     
     async def summarize_file(self, file: UploadFile, api_key: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -56,9 +288,36 @@ class SummarizeService:
         :param api_key: 可选的API密钥
         :return: 包含总结和追问问题的字典
         """
+        return await self._summarize_spooled(spool_upload(file), api_key)
+
+    async def summarize_upload(self, request: Request, api_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        总结 multipart 请求中上传的文件，请求体直接流式写入临时文件
+        :param request: 包含 file 字段的上传请求
+        :param api_key: 可选的API密钥
+        :return: 包含总结和追问问题的字典
+        """
+        return await self._summarize_spooled(spool_request_upload(request), api_key)
+
+    async def _summarize_spooled(self, upload: AsyncContextManager[SpooledUpload], api_key: Optional[str]) -> Dict[str, Any]:
+        IN_FLIGHT.inc(endpoint="file")
         try:
-            # 处理文件内容
-            content = self.file_processor.extract_content(file.filename)
+            # 上传内容分块暂存到临时文件，按文件头识别类型后提取
+            async with upload as (file_path, filename):
+                file_type = self.file_processor.detect_file_type(file_path, filename)
+                extraction_config = self.config.get_extraction_config()
+                # 解析可能在子进程中执行，耗时在调用处记录
+                try:
+                    with span("extract", source=file_type), EXTRACTION_SECONDS.time(source=file_type):
+                        content = await task_executor.run_cpu_bound(
+                            extract_file_content, file_path, file_type,
+                            extraction_config.get('max_chars'), extraction_config.get('max_tokens'),
+                            size=os.path.getsize(file_path)
+                        )
+                except Exception:
+                    ERRORS.inc(stage="extract")
+                    raise
+                CONTENT_LENGTH.observe(len(content), source="file")
             
             # 使用 AI 服务生成总结
             summary = await self.ai_service.generate_summary(content, api_key)
@@ -70,8 +329,12 @@ class SummarizeService:
                 "summary": summary,
                 "follow_up_questions": questions
             }
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=400,
                 detail=f"文件内容总结失败: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+        finally:
+            IN_FLIGHT.dec(endpoint="file") 
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional, Tuple
+from fastapi import HTTPException
+from src.utils.config_manager import ConfigManager, ConfigSnapshot
+from src.utils.logger import get_logger
+from src.utils.metrics import LLM_CONCURRENCY_LIMIT
+
+logger = get_logger("sumbot.adaptive_limiter")
+
+# 调用结果：成功、上游过载（429/503）、超时、其他错误
+SUCCESS = "success"
+OVERLOAD = "overload"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 并发控制：名额用满且延迟正常时缓慢增加并发上限，遇到过载、超时或延迟过高时按比例降低
+    在上次降低之前发出的请求失败不再触发降低，避免同一波并发失败把上限压到最低
+    """
+
+    def __init__(self, service_name: str, model: str, config: Mapping[str, Any]):
+        self.name = f"{service_name}/{model}"
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self._labels = {"provider": service_name, "model": model}
+        self.limit = float(config.get('initial_limit', 8))
+        self.configure(config)
+        LLM_CONCURRENCY_LIMIT.set(int(self.limit), **self._labels)
+
+    def configure(self, config: Mapping[str, Any]) -> None:
+        """
+        应用控制参数，配置重新加载时保留当前上限并限制在新的范围内
+        :param config: llm_concurrency 配置
+        """
+        self.min_limit = config.get('min_limit', 1)
+        self.max_limit = config.get('max_limit', 64)
+        self.increase = config.get('increase', 1)
+        self.decrease_factor = config.get('decrease_factor', 0.5)
+        self.slow_decrease_factor = config.get('slow_decrease_factor', 0.9)
+        self.latency_threshold = config.get('latency_threshold', 20)
+        self.queue_timeout = config.get('queue_timeout', 30)
+        self._set_limit(self.limit)
+        self._wake_waiters()
+
+    async def acquire(self) -> None:
+        """
+        获取一个并发名额，排队超过 queue_timeout 时返回 503
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # 名额已转交但调用方已离开，归还名额
+                self._release_slot()
+            else:
+                future.cancel()
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"{self.name} 模型调用排队超时: 上限 {int(self.limit)}, 排队 {len(self._waiters)}")
+                raise HTTPException(status_code=503, detail="模型服务繁忙，请稍后重试")
+            raise
+
+    def release(self, latency: float, outcome: str) -> None:
+        """
+        归还名额并根据结果调整上限
+        :param latency: 本次调用耗时（秒）
+        :param outcome: 调用结果 SUCCESS、OVERLOAD、TIMEOUT 或 ERROR
+        """
+        now = time.monotonic()
+        started_at = now - latency
+        if outcome == SUCCESS:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            if latency > self.latency_threshold:
+                self._decrease(self.slow_decrease_factor, f"延迟 {latency:.1f}s", started_at, now)
+            elif self.in_flight >= int(self.limit):
+                # 名额用满时每完成约 limit 次调用增加 increase，未用满时上限不代表实际承载能力
+                self._set_limit(self.limit + self.increase / self.limit)
+        elif outcome in (OVERLOAD, TIMEOUT):
+            self._decrease(self.decrease_factor, outcome, started_at, now)
+        self._release_slot()
+
+    def _decrease(self, factor: float, reason: str, started_at: float, now: float) -> None:
+        if started_at < self._last_decrease:
+            return
+        self._last_decrease = now
+        old = int(self.limit)
+        self._set_limit(self.limit * factor)
+        if int(self.limit) != old:
+            logger.info(f"{self.name} 并发上限 {old} -> {int(self.limit)} ({reason})")
+
+    def _set_limit(self, limit: float) -> None:
+        old = int(self.limit)
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        if int(self.limit) != old:
+            LLM_CONCURRENCY_LIMIT.set(int(self.limit), **self._labels)
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "latency_ewma": self.latency_ewma,
+        }
+
+
+class LimiterRegistry:
+    """按 (服务, 模型) 分别维护的并发控制器"""
+
+    def __init__(self):
+        config = ConfigManager()
+        self.config = config.get_llm_concurrency_config()
+        self._limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+        config.subscribe(self._apply_config)
+
+    def _apply_config(self, snapshot: ConfigSnapshot) -> None:
+        self.config = snapshot.get('llm_concurrency', {})
+        for limiter in self._limiters.values():
+            limiter.configure(self.config)
+
+    def get(self, service_name: str, model: str) -> AdaptiveLimiter:
+        key = (service_name, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = AdaptiveLimiter(service_name, model, self.config)
+        return limiter
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {limiter.name: limiter.get_stats() for limiter in self._limiters.values()}
+
+
+# 进程级并发控制器
+llm_limiters = LimiterRegistry()
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Tuple
+import httpx
+from openai import AsyncOpenAI
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+
+logger = get_logger("sumbot.ai_client_registry")
+
+
+def hash_api_key(api_key: str) -> str:
+    """API密钥只以哈希形式出现在注册表键和日志中"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+class AIClientRegistry:
+    """
+    长期存活的 AsyncOpenAI 客户端注册表
+    按 (服务名, api_base, 密钥哈希) 复用客户端及其连接池，超出容量时按LRU淘汰
+    客户端的连接绑定在创建它的事件循环上，事件循环关闭或更换后重新创建
+    """
+
+    def __init__(self):
+        client_config = ConfigManager().get_ai_client_config()
+        self.max_clients = client_config.get('max_clients', 32)
+        self.timeout = client_config.get('timeout', 30.0)
+        self.limits = httpx.Limits(
+            max_connections=client_config.get('max_connections', 100),
+            max_keepalive_connections=client_config.get('max_keepalive_connections', 20),
+            keepalive_expiry=client_config.get('keepalive_expiry', 30.0)
+        )
+        self._clients: "OrderedDict[Tuple[str, str, str], Tuple[AsyncOpenAI, asyncio.AbstractEventLoop]]" = OrderedDict()
+
+    def get(self, service_name: str, api_base: str, api_key: str) -> AsyncOpenAI:
+        """
+        获取客户端，不存在时创建
+        :param service_name: 服务名称
+        :param api_base: API基础URL
+        :param api_key: API密钥
+        :return: AsyncOpenAI 客户端
+        """
+        key = (service_name, api_base, hash_api_key(api_key))
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(key)
+        if entry is not None:
+            client, client_loop = entry
+            if client_loop is loop:
+                self._clients.move_to_end(key)
+                return client
+            # 属于已关闭或其他事件循环的客户端不能在当前循环中使用
+            del self._clients[key]
+            self._close_on_loop(client, client_loop)
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=api_base,
+            timeout=self.timeout,
+            # 重试由 AIService 统一处理，以便并发控制器观察到每一次 429 和超时
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        )
+        self._clients[key] = (client, loop)
+        logger.debug(f"已创建 {service_name} 客户端 (key={key[2]})")
+
+        while len(self._clients) > self.max_clients:
+            _, (evicted, evicted_loop) = self._clients.popitem(last=False)
+            self._close_on_loop(evicted, evicted_loop, delay=self.timeout)
+        return client
+
+    @staticmethod
+    def _close_on_loop(client: AsyncOpenAI, loop: asyncio.AbstractEventLoop, delay: float = 0) -> None:
+        """
+        在客户端所属的事件循环上关闭客户端
+        :param client: 待关闭的客户端
+        :param loop: 创建客户端的事件循环，已关闭时连接随循环失效，只能丢弃
+        :param delay: 延迟关闭的秒数，被淘汰的客户端可能仍有请求在进行
+        """
+        if loop.is_closed():
+            return
+
+        def schedule() -> None:
+            loop.call_later(delay, lambda: loop.create_task(client.close()))
+
+        try:
+            loop.call_soon_threadsafe(schedule)
+        except RuntimeError:
+            # 检查之后循环恰好关闭
+            pass
+
+    async def close_all(self) -> None:
+        """关闭所有客户端"""
+        loop = asyncio.get_running_loop()
+        entries = list(self._clients.values())
+        self._clients.clear()
+        for client, client_loop in entries:
+            if client_loop is not loop:
+                self._close_on_loop(client, client_loop)
+                continue
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"关闭AI客户端失败: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+# 进程级共享注册表
+client_registry = AIClientRegistry()
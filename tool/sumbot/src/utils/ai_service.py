@@ -1,25 +1,101 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+import openai
+from fastapi import HTTPException
 from openai import AsyncOpenAI
-from typing import List, Optional
-from src.utils.config_manager import ConfigManager
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from src.utils.config_manager import ConfigManager, ConfigSnapshot
+from src.utils.ai_client_registry import client_registry
+from src.utils.adaptive_limiter import llm_limiters, SUCCESS, OVERLOAD, TIMEOUT, ERROR
+from src.utils.provider_router import provider_router, CLOSED
+from src.utils.hedging import hedge_policy
 from src.utils.logger import get_logger
+from src.utils.tracing import span
+from src.utils.metrics import LLM_SECONDS, LLM_RETRIES, LLM_FAILOVERS, LLM_HEDGES, COMPLETION_LENGTH, ERRORS
+from src.utils.text_splitter import split_text
 
 logger = get_logger("sumbot.ai_service")
 
+SUMMARY_PROMPT = "你是一个专业的文章总结助手。请简洁明了地总结以下内容的要点："
+CHUNK_PROMPT = "你是一个专业的文章总结助手。以下是一篇长文档中的一个片段，请简洁地总结该片段的要点："
+REDUCE_PROMPT = "你是一个专业的文章总结助手。以下是同一篇长文档各部分的要点总结，请合并为一份简洁明了、不重复的要点总结："
+
+def _classify_error(error: Exception) -> Tuple[str, bool]:
+    """
+    判断模型调用错误的类型
+    :return: (调用结果, 是否可以重试)
+    """
+    if isinstance(error, openai.RateLimitError):
+        return OVERLOAD, True
+    if isinstance(error, openai.APITimeoutError):
+        return TIMEOUT, True
+    if isinstance(error, openai.APIConnectionError):
+        return ERROR, True
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        # 503/529 表示上游过载
+        return (OVERLOAD if error.status_code in (503, 529) else ERROR), True
+    return ERROR, False
+
+def _can_fail_over(error: Exception) -> bool:
+    """
+    错误是否由服务商本身引起，可以切换到其他服务商：
+    可重试的错误、排队超时，以及密钥无效、无权限、模型不存在等只与该服务商有关的错误
+    """
+    if isinstance(error, HTTPException):
+        return error.status_code == 503
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError, openai.NotFoundError)):
+        return True
+    return _classify_error(error)[1]
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """读取错误响应中的 Retry-After（秒），没有时返回 None"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
 class AIService:
     def __init__(self):
         self.config = ConfigManager()
-        self.client = None
-        self.model = None
+        self.client_registry = client_registry
+        self.limiters = llm_limiters
+        self.router = provider_router
+        self.hedging = hedge_policy
+        self._apply_config(self.config.snapshot)
+        self.config.subscribe(self._apply_config)
+    
+    def _apply_config(self, snapshot: ConfigSnapshot) -> None:
+        """读取重试参数，配置重新加载后同样调用"""
+        concurrency_config = snapshot.get('llm_concurrency', {})
+        self.max_retries = concurrency_config.get('max_retries', 3)
+        self.backoff_base = concurrency_config.get('backoff_base', 0.5)
+        self.backoff_max = concurrency_config.get('backoff_max', 10)
+        self.max_retry_after = concurrency_config.get('max_retry_after', 30)
     
-    def _init_client(self, api_key: Optional[str] = None):
+    def _get_client(self, api_key: Optional[str] = None, service_name: Optional[str] = None) -> Tuple[AsyncOpenAI, str, str]:
         """
-        延迟初始化客户端
+        从注册表获取客户端
         优先使用传入的 api_key，否则使用配置中的密钥
+        :param service_name: 服务名称，不指定时使用默认服务
+        :return: (客户端, 服务名称, 模型名称)，不修改任何共享状态，并发请求互不影响
         """
         try:
-            ai_config = self.config.get_ai_service_config()
-            service_name = ai_config.get('service')
-            service_config = ai_config
+            service_config = self.config.get_ai_service_config(service_name)
+            service_name = service_config.get('service')
             
             # 验证必要的配置项
             if not service_config.get('api_base'):
@@ -31,25 +107,15 @@ class AIService:
             if api_key:
                 if not api_key.startswith('sk-'):
                     raise ValueError("API密钥必须以 'sk-' 开头")
-                service_config['api_key'] = api_key
-            elif not service_config.get('api_key'):
-                # 如果没有提供 API 密钥且配置中也没有，使用默认密钥
-                default_key = ai_config.get('default_api_key')
-                if not default_key:
+                resolved_key = api_key
+            else:
+                # 配置中未单独设置密钥的服务已回退到默认密钥
+                resolved_key = service_config.get('api_key')
+                if not resolved_key:
                     raise ValueError("未提供API密钥且未配置默认密钥")
-                service_config['api_key'] = default_key
-            
-            # 创建客户端
-            self.client = AsyncOpenAI(
-                api_key=service_config['api_key'],
-                base_url=service_config['api_base'],
-                timeout=30.0
-            )
-            self.model = service_config['model']
             
-            logger.debug(f"已初始化 {service_name} 客户端")
-            logger.debug(f"使用模型: {self.model}")
-            logger.debug(f"API Base URL: {service_config['api_base']}")
+            client = self.client_registry.get(service_name, service_config['api_base'], resolved_key)
+            return client, service_name, service_config['model']
         except Exception as e:
             logger.error(f"初始化AI客户端失败: {str(e)}")
             raise
@@ -57,36 +123,116 @@ class AIService:
     async def generate_summary(self, content: str, api_key: Optional[str] = None) -> str:
         """
         生成内容总结
+        超过长度阈值的内容自动切换为分块总结再归并
         :param content: 要总结的内容
         :param api_key: 可选的 API 密钥
         """
-        if not self.client or api_key:
-            self._init_client(api_key)
+        long_config = self.config.get_long_document_config()
+        if self._is_long_document(content, long_config):
+            partials = await self._map_reduce_partials(content, api_key, long_config)
+            return await self._complete_summary("\n\n".join(partials), api_key, REDUCE_PROMPT)
+        return await self._complete_summary(content, api_key)
+    
+    async def generate_summary_stream(self, content: str, api_key: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        流式生成内容总结，逐段产出模型返回的文本
+        长文档先完成分块总结，再流式输出最终归并结果
+        :param content: 要总结的内容
+        :param api_key: 可选的 API 密钥
+        """
+        system_prompt = SUMMARY_PROMPT
+        long_config = self.config.get_long_document_config()
+        if self._is_long_document(content, long_config):
+            partials = await self._map_reduce_partials(content, api_key, long_config)
+            content = "\n\n".join(partials)
+            system_prompt = REDUCE_PROMPT
         
         try:
-            # 记录请求信息
-            logger.info("发送总结请求:")
-            logger.info(f"模型: {self.model}")
-            logger.info(f"内容长度: {len(content)} 字符")
-            logger.info(f"API Base URL: {self.client.base_url}")
-            
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            async for delta in self._stream_completion(
+                api_key,
                 messages=[
-                    {"role": "system", "content": "你是一个专业的文章总结助手。请简洁明了地总结以下内容的要点："},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": content}
                 ],
                 temperature=0.7,
                 max_tokens=500
+            ):
+                yield delta
+        except Exception as e:
+            ERRORS.inc(stage="llm")
+            logger.error(f"流式生成总结失败: {str(e)}")
+            logger.error(f"错误类型: {type(e).__name__}")
+            raise Exception(f"生成总结失败: {str(e)}")
+    
+    @staticmethod
+    def _is_long_document(content: str, long_config: dict) -> bool:
+        """判断是否需要分块总结"""
+        return long_config.get('enabled', True) and len(content) > long_config.get('threshold', 12000)
+    
+    async def _map_reduce_partials(self, content: str, api_key: Optional[str], long_config: dict) -> List[str]:
+        """
+        分块并发总结，再分层归并，直到剩余的部分总结不超过 fan_out 个
+        :param content: 长文档内容
+        :param api_key: 可选的 API 密钥
+        :param long_config: 长文档配置
+        :return: 待最终归并的部分总结列表
+        """
+        chunks = split_text(
+            content,
+            chunk_size=long_config.get('chunk_size', 6000),
+            overlap=long_config.get('chunk_overlap', 200)
+        )
+        fan_out = max(2, long_config.get('fan_out', 5))
+        semaphore = asyncio.Semaphore(max(1, long_config.get('max_concurrency', 4)))
+        chunk_max_tokens = long_config.get('chunk_max_tokens', 300)
+        logger.info(f"长文档分块总结: 内容长度 {len(content)} 字符, 共 {len(chunks)} 块")
+        
+        async def summarize(text: str, prompt: str) -> str:
+            async with semaphore:
+                return await self._complete_summary(text, api_key, prompt, max_tokens=chunk_max_tokens)
+        
+        with span("map_reduce", chunks=len(chunks)):
+            summaries = await asyncio.gather(*(summarize(chunk, CHUNK_PROMPT) for chunk in chunks))
+            
+            # 部分总结过多时逐层归并
+            while len(summaries) > fan_out:
+                groups = [summaries[i:i + fan_out] for i in range(0, len(summaries), fan_out)]
+                logger.info(f"归并部分总结: {len(summaries)} -> {len(groups)}")
+                summaries = await asyncio.gather(*(summarize("\n\n".join(group), REDUCE_PROMPT) for group in groups))
+        return list(summaries)
+    
+    async def _complete_summary(
+        self,
+        content: str,
+        api_key: Optional[str] = None,
+        system_prompt: str = SUMMARY_PROMPT,
+        max_tokens: int = 500
+    ) -> str:
+        """
+        单次调用模型生成总结
+        :param content: 要总结的内容
+        :param api_key: 可选的 API 密钥
+        :param system_prompt: 系统提示词
+        :param max_tokens: 最大生成长度
+        """
+        try:
+            response = await self._create_completion(
+                api_key,
+                "complete",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": content}
+                ],
+                temperature=0.7,
+                max_tokens=max_tokens
             )
             
             # 记录响应信息
-            logger.info("收到总结响应:")
-            logger.info(f"响应状态: 成功")
-            logger.info(f"总结长度: {len(response.choices[0].message.content)} 字符")
+            logger.info(f"收到总结响应: 总结长度 {len(response.choices[0].message.content)} 字符")
             
             return response.choices[0].message.content.strip()
         except Exception as e:
+            ERRORS.inc(stage="llm")
             logger.error(f"生成总结失败: {str(e)}")
             logger.error(f"错误类型: {type(e).__name__}")
             logger.error(f"错误详情: {str(e)}")
@@ -99,12 +245,15 @@ class AIService:
         :param summary: 总结内容
         :param api_key: 可选的 API 密钥
         """
-        if not self.client or api_key:
-            self._init_client(api_key)
+        # 长文档只取开头部分作为追问的上下文，避免超出模型上下文
+        long_config = self.config.get_long_document_config()
+        if self._is_long_document(content, long_config):
+            content = content[:long_config.get('chunk_size', 6000)]
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            response = await self._create_completion(
+                api_key,
+                "follow_up",
                 messages=[
                     {"role": "system", "content": "基于文章内容和总结，生成3个有见地的追问问题："},
                     {"role": "user", "content": f"文章内容：{content}\n\n总结：{summary}"}
@@ -115,5 +264,251 @@ class AIService:
             questions = response.choices[0].message.content.strip().split('\n')
             return [q.strip('1234567890. ') for q in questions if q.strip()]
         except Exception as e:
+            ERRORS.inc(stage="llm")
             logger.error(f"生成追问问题失败: {str(e)}")
-            raise Exception(f"生成追问问题失败: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"生成追问问题失败: {str(e)}") 
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        计算重试等待时间：优先遵循 Retry-After，否则使用带随机抖动的指数退避
+        :return: 等待秒数，Retry-After 超过上限时返回 None（不再重试）
+        """
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            return retry_after + random.uniform(0, min(1.0, retry_after * 0.1))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _next_attempt(self, error: Exception, providers: List[str], index: int, retries: int) -> Tuple[bool, Optional[float]]:
+        """
+        失败后决定下一次调用：先依次切换到其余服务商，全部失败后按退避策略重试，再从首选服务商开始新一轮
+        :param index: 本次调用的服务商在 providers 中的位置
+        :param retries: 已经进行的退避重试次数
+        :return: (是否切换服务商, 等待秒数)，不再重试时等待秒数为 None
+        """
+        outcome, retryable = _classify_error(error)
+        if index + 1 < len(providers) and _can_fail_over(error):
+            LLM_FAILOVERS.inc(provider=providers[index], reason=outcome)
+            return True, 0.0
+        if not retryable or retries >= self.max_retries:
+            return False, None
+        return False, self._retry_delay(error, retries)
+    
+    async def _call_provider(
+        self,
+        api_key: Optional[str],
+        service_name: str,
+        mode: str,
+        started: Optional[asyncio.Event] = None,
+        **params: Any
+    ) -> Tuple[Any, str, str, float]:
+        """
+        向单个服务商发出一次非流式调用，占用并发名额并记录结果
+        :param service_name: 服务名称
+        :param started: 获得并发名额、请求发出时设置的事件
+        :return: (响应, 服务名称, 模型名称, 耗时)
+        :raises: 调用失败或排队超时（HTTPException 503）时抛出
+        """
+        client, service_name, model = self._get_client(api_key, service_name)
+        limiter = self.limiters.get(service_name, model)
+        logger.info(f"发送模型请求: 服务 {service_name}, 模型 {model}, 类型 {mode}")
+        
+        await limiter.acquire()
+        if started is not None:
+            started.set()
+        start = time.perf_counter()
+        outcome = ERROR
+        try:
+            response = await client.chat.completions.create(model=model, **params)
+            outcome = SUCCESS
+        except Exception as e:
+            outcome, _ = _classify_error(e)
+            # 请求本身的错误（如参数无效）不计入服务商健康状态
+            if _can_fail_over(e):
+                self.router.record(service_name, time.perf_counter() - start, outcome)
+            raise
+        finally:
+            # 被对冲请求取消时按 ERROR 归还名额，不影响并发上限
+            latency = time.perf_counter() - start
+            limiter.release(latency, outcome)
+        self.router.record(service_name, latency, outcome)
+        self.hedging.observe(service_name, latency)
+        return response, service_name, model, latency
+    
+    async def _hedged_call(self, api_key: Optional[str], providers: List[str], index: int, mode: str, **params: Any) -> Tuple[Any, str, str, float]:
+        """
+        超过该服务近期延迟的分位数仍未返回时，向下一个服务商（熔断或探测中时同一服务商）发出对冲请求，
+        先成功的结果返回，另一个取消；两个都失败时抛出首个请求的错误
+        :param index: 首个请求使用的服务商在 providers 中的位置
+        """
+        primary_name = providers[index]
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self._call_provider(api_key, primary_name, mode, started, **params))
+        tasks = [primary]
+        try:
+            delay = self.hedging.delay(primary_name)
+            if delay is None:
+                return await primary
+            # 延迟样本不含排队时间，从请求发出时开始计时
+            waiter = asyncio.ensure_future(started.wait())
+            try:
+                await asyncio.wait([primary, waiter], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            if not primary.done():
+                await asyncio.wait(tasks, timeout=delay)
+            if primary.done():
+                return primary.result()
+            if not self.hedging.try_spend():
+                LLM_HEDGES.inc(result="over_budget")
+                return await primary
+            
+            hedge_name = primary_name
+            if self.hedging.alternate_provider and len(providers) > 1:
+                alternate = providers[(index + 1) % len(providers)]
+                if self.router.health(alternate).state(time.monotonic()) == CLOSED:
+                    hedge_name = alternate
+            logger.info(f"{primary_name} 调用超过 {delay:.1f}s 未返回，向 {hedge_name} 发出对冲请求")
+            LLM_HEDGES.inc(result="sent")
+            hedge = asyncio.ensure_future(self._call_provider(api_key, hedge_name, mode, **params))
+            tasks.append(hedge)
+            
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        # 对冲请求先返回即为对冲生效
+                        LLM_HEDGES.inc(result="won" if task is hedge else "lost")
+                        return task.result()
+            LLM_HEDGES.inc(result="failed")
+            raise primary.exception()
+        finally:
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                # 等待取消完成，确保并发名额已归还
+                await asyncio.gather(*unfinished, return_exceptions=True)
+    
+    async def _create_completion(self, api_key: Optional[str], mode: str, **params: Any) -> Any:
+        """
+        所有非流式模型调用的入口：按路由选择服务商，调用过慢时发出对冲请求，失败时切换服务商；
+        按 (服务, 模型) 自适应限制并发，遇到 429、超时和 5xx 时退避重试
+        :param api_key: 可选的 API 密钥
+        :param mode: 调用类型，用于指标和追踪
+        :param params: 传给 chat.completions.create 的参数（不含 model）
+        """
+        providers = self.router.candidates(api_key)
+        
+        with span("llm", mode=mode) as current:
+            index = 0
+            retries = 0
+            while True:
+                service_name = providers[index % len(providers)]
+                try:
+                    # 排队超时（503）同样切换到其他服务商
+                    response, service_name, model, latency = await self._hedged_call(
+                        api_key, providers, index % len(providers), mode, **params
+                    )
+                except Exception as e:
+                    error = e
+                else:
+                    LLM_SECONDS.observe(latency, model=model, mode=mode)
+                    COMPLETION_LENGTH.observe(len(response.choices[0].message.content or ""), model=model)
+                    if current is not None:
+                        current.attrs.update(provider=service_name, model=model, attempts=index + 1)
+                    return response
+                
+                failover, delay = self._next_attempt(error, providers, index % len(providers), retries)
+                if delay is None:
+                    raise error
+                if not failover:
+                    retries += 1
+                    LLM_RETRIES.inc(provider=service_name, reason=_classify_error(error)[0])
+                    logger.warning(f"{service_name} 调用失败，{delay:.1f}s 后第 {retries} 次重试: {type(error).__name__}")
+                    await asyncio.sleep(delay)
+                else:
+                    logger.warning(f"{service_name} 调用失败，切换到 {providers[(index + 1) % len(providers)]}: {type(error).__name__}")
+                index += 1
+    
+    async def _stream_completion(self, api_key: Optional[str], **params: Any) -> AsyncIterator[str]:
+        """
+        流式模型调用的入口：并发名额保持到流结束；只在尚未收到任何内容时切换服务商或重试
+        :param api_key: 可选的 API 密钥
+        :param params: 传给 chat.completions.create 的参数（不含 model 和 stream）
+        """
+        providers = self.router.candidates(api_key)
+        
+        with span("llm", mode="stream") as current:
+            index = 0
+            retries = 0
+            while True:
+                client, service_name, model = self._get_client(api_key, providers[index % len(providers)])
+                limiter = self.limiters.get(service_name, model)
+                logger.info(f"发送流式模型请求: 服务 {service_name}, 模型 {model}")
+                if current is not None:
+                    current.attrs.update(provider=service_name, model=model)
+                
+                try:
+                    await limiter.acquire()
+                except HTTPException as e:
+                    error = e
+                else:
+                    start = time.perf_counter()
+                    outcome = ERROR
+                    error = None
+                    try:
+                        stream = await client.chat.completions.create(model=model, stream=True, **params)
+                    except Exception as e:
+                        outcome, _ = _classify_error(e)
+                        error = e
+                        latency = time.perf_counter() - start
+                        limiter.release(latency, outcome)
+                        if _can_fail_over(e):
+                            self.router.record(service_name, latency, outcome)
+                    except BaseException:
+                        limiter.release(time.perf_counter() - start, outcome)
+                        raise
+                
+                if error is not None:
+                    failover, delay = self._next_attempt(error, providers, index % len(providers), retries)
+                    if delay is None:
+                        raise error
+                    if not failover:
+                        retries += 1
+                        LLM_RETRIES.inc(provider=service_name, reason=_classify_error(error)[0])
+                        logger.warning(f"{service_name}/{model} 流式调用失败，{delay:.1f}s 后第 {retries} 次重试: {type(error).__name__}")
+                        await asyncio.sleep(delay)
+                    else:
+                        logger.warning(f"{service_name}/{model} 流式调用失败，切换到 {providers[(index + 1) % len(providers)]}: {type(error).__name__}")
+                    index += 1
+                    continue
+                
+                completion_length = 0
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            completion_length += len(delta)
+                            yield delta
+                    outcome = SUCCESS
+                except Exception as e:
+                    outcome, _ = _classify_error(e)
+                    error = e
+                    raise
+                finally:
+                    # 客户端断开时及时释放上游连接
+                    await stream.close()
+                    latency = time.perf_counter() - start
+                    limiter.release(latency, outcome)
+                    # 客户端断开不计入服务商健康状态
+                    if outcome == SUCCESS or (error is not None and _can_fail_over(error)):
+                        self.router.record(service_name, latency, outcome)
+                
+                LLM_SECONDS.observe(latency, model=model, mode="stream")
+                COMPLETION_LENGTH.observe(completion_length, model=model)
+                return
@@ -1,5 +1,7 @@
+import hmac
+import ipaddress
 import re
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
 from typing import Optional
 
 class APIKeyValidator:
@@ -70,4 +72,32 @@ async def validate_api_key(api_key: Optional[str]) -> None:
         raise HTTPException(
             status_code=401,
             detail="无效的API密钥"
-        ) 
\ No newline at end of file
+        ) 
+
+def _is_loopback(host: Optional[str]) -> bool:
+    try:
+        address = ipaddress.ip_address(host or '')
+    except ValueError:
+        return False
+    # IPv4 映射的 IPv6 地址（::ffff:127.0.0.1）按 IPv4 判断
+    mapped = getattr(address, 'ipv4_mapped', None)
+    return (mapped or address).is_loopback
+
+def verify_admin_access(request: Request, token: Optional[str]) -> None:
+    """
+    调试和管理端点的访问控制：配置了令牌时校验 X-Admin-Token 请求头，否则只允许本机访问
+    :param request: 当前请求
+    :param token: 配置的访问令牌
+    :raises: HTTPException 如果无权访问
+    """
+    if token:
+        if not hmac.compare_digest(request.headers.get('x-admin-token', '').encode(), str(token).encode()):
+            raise HTTPException(
+                status_code=403,
+                detail="无效的管理令牌"
+            )
+    elif not _is_loopback(request.client.host if request.client else None):
+        raise HTTPException(
+            status_code=403,
+            detail="该端点只允许本机访问"
+        )
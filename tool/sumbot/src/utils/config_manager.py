@@ -1,101 +1,284 @@
+import asyncio
 import json
+import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+# logger 模块在初始化时会读取本模块的配置，这里直接使用标准库记录器，避免循环导入
+logger = logging.getLogger("sumbot.config")
+
+CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'config.json'
+)
+
+# 各AI服务必须配置的字段
+REQUIRED_FIELDS = {
+    'oneapi': ['api_key', 'api_base', 'model'],
+    'openai': ['api_key', 'api_base', 'model'],
+    'gemini': ['api_key'],
+    'azure': ['api_key', 'api_base'],
+    'xunfei': ['app_id', 'api_key', 'api_secret']
+}
+
+
+def freeze(value: Any) -> Any:
+    """递归地把字典转为只读映射、列表转为元组"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ConfigSnapshot:
+    """
+    某一时刻的只读配置，加载时完成所有校验和默认值合并，之后不再修改
+    AI服务配置解析失败时保存错误信息，在读取该服务时抛出
+    """
+
+    __slots__ = ('data', 'mtime', '_ai_services', '_ai_errors')
+
+    def __init__(self, data: Dict[str, Any], mtime: float = 0.0):
+        self.data = freeze(data)
+        self.mtime = mtime
+        self._ai_services: Dict[str, Mapping[str, Any]] = {}
+        self._ai_errors: Dict[str, str] = {}
+
+        ai_config = data.get('ai_service', {})
+        default_api_key = ai_config.get('default_api_key')
+        for service_name, service_config in ai_config.items():
+            if not isinstance(service_config, dict):
+                continue
+            service_config = dict(service_config)
+            # 如果服务没有配置api_key，使用默认api_key
+            if 'api_key' not in service_config and default_api_key:
+                service_config['api_key'] = default_api_key
+            missing_fields = [
+                field for field in REQUIRED_FIELDS.get(service_name, [])
+                if not service_config.get(field)
+            ]
+            if missing_fields:
+                self._ai_errors[service_name] = (
+                    f"AI服务 {service_name} 缺少必要的配置项: {', '.join(missing_fields)}"
+                )
+                continue
+            self._ai_services[service_name] = freeze({
+                'name': service_config.get('name', service_name.title()),
+                'service': service_name,
+                **service_config
+            })
+
+    def get(self, section: str, default: Any = None) -> Any:
+        return self.data.get(section, MappingProxyType(default) if isinstance(default, dict) else default)
+
+    def get_ai_service(self, service_name: Optional[str] = None) -> Mapping[str, Any]:
+        if not service_name:
+            service_name = self.data.get('ai_service', {}).get('default')
+            if not service_name:
+                raise Exception("未配置默认AI服务")
+        if service_name in self._ai_errors:
+            raise Exception(self._ai_errors[service_name])
+        service_config = self._ai_services.get(service_name)
+        if service_config is None:
+            raise Exception(f"未找到AI服务配置: {service_name}")
+        return service_config
+
 
 class ConfigManager:
+    """
+    配置管理：读取方直接引用当前快照，不加锁
+    重新加载时在线程池中构建新快照，回到事件循环后整体替换，解析失败时保留旧配置
+    """
+
     _instance = None
-    _config = None
-    
+    _snapshot: Optional[ConfigSnapshot] = None
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ConfigManager, cls).__new__(cls)
+            cls._instance._reload_lock = threading.Lock()
+            cls._instance._async_reload_lock: Optional[asyncio.Lock] = None
+            cls._instance._listeners: List[Callable[[ConfigSnapshot], None]] = []
         return cls._instance
-    
+
     def __init__(self):
-        if self._config is None:
-            self._load_config()
-    
-    def _load_config(self):
-        """加载配置文件"""
-        config_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'config.json'
-        )
-        
-        try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                self._config = json.load(f)
-        except Exception as e:
-            raise Exception(f"加载配置文件失败: {str(e)}")
-    
-    def get_api_config(self) -> Dict[str, Any]:
+        if self._snapshot is None:
+            try:
+                self._snapshot = self._load_snapshot()
+            except Exception as e:
+                raise Exception(f"加载配置文件失败: {str(e)}")
+
+    @staticmethod
+    def _load_snapshot() -> ConfigSnapshot:
+        """读取配置文件并构建快照"""
+        mtime = os.stat(CONFIG_PATH).st_mtime
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("配置文件顶层必须是对象")
+        return ConfigSnapshot(data, mtime)
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """当前配置快照，需要多次读取且保持一致时使用"""
+        return self._snapshot
+
+    @property
+    def _config(self) -> Mapping[str, Any]:
+        return self._snapshot.data
+
+    def reload(self) -> bool:
+        """
+        同步重新加载配置文件，成功后在调用线程中通知订阅方
+        服务运行期间请使用 reload_async：订阅方会修改事件循环中的状态，不能在其他线程中执行
+        :return: 是否加载成功
+        """
+        with self._reload_lock:
+            try:
+                snapshot = self._load_snapshot()
+            except Exception as e:
+                logger.error(f"重新加载配置失败，继续使用当前配置: {str(e)}")
+                return False
+            self._apply(snapshot)
+        return True
+
+    async def reload_async(self) -> bool:
+        """
+        在线程池中读取和解析配置文件，再回到事件循环替换快照并通知订阅方
+        :return: 是否加载成功
+        """
+        if self._async_reload_lock is None:
+            self._async_reload_lock = asyncio.Lock()
+        async with self._async_reload_lock:
+            try:
+                snapshot = await asyncio.to_thread(self._load_snapshot)
+            except Exception as e:
+                logger.error(f"重新加载配置失败，继续使用当前配置: {str(e)}")
+                return False
+            self._apply(snapshot)
+        return True
+
+    def _apply(self, snapshot: ConfigSnapshot) -> None:
+        """替换当前快照并通知订阅方"""
+        self._snapshot = snapshot
+        logger.info("配置已重新加载")
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"应用新配置失败: {getattr(listener, '__qualname__', listener)}: {str(e)}")
+
+    def subscribe(self, listener: Callable[[ConfigSnapshot], None]) -> None:
+        """
+        注册配置变更回调，重新加载成功后以新快照调用
+        :param listener: 回调函数
+        """
+        self._listeners.append(listener)
+
+    async def watch(self, interval: float = 2.0) -> None:
+        """
+        定期检查配置文件的修改时间，变化时重新加载（加载失败的版本不再重试）
+        :param interval: 检查间隔（秒）
+        """
+        seen_mtime = self._snapshot.mtime
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(CONFIG_PATH).st_mtime
+            except OSError:
+                continue
+            if mtime != seen_mtime:
+                seen_mtime = mtime
+                await self.reload_async()
+
+    def get_api_config(self) -> Mapping[str, Any]:
         """获取API配置"""
         return self._config.get('api', {})
-    
-    def get_ai_service_config(self, service_name: Optional[str] = None) -> Dict[str, Any]:
+
+    def get_ai_service_config(self, service_name: Optional[str] = None) -> Mapping[str, Any]:
         """
-        获取AI服务配置
+        获取AI服务配置（加载配置时已完成校验和默认api_key合并）
         :param service_name: 服务名称，如果不指定则返回默认服务的配置
         :return: AI服务配置
         :raises: Exception 如果找不到配置或配置无效
         """
-        ai_config = self._config.get('ai_service', {})
-        default_api_key = ai_config.get('default_api_key')
-        
-        # 如果没有指定服务名称，使用默认服务
-        if not service_name:
-            service_name = ai_config.get('default')
-            if not service_name:
-                raise Exception("未配置默认AI服务")
-        
-        # 获取服务配置
-        service_config = ai_config.get(service_name)
-        if not service_config:
-            raise Exception(f"未找到AI服务配置: {service_name}")
-        
-        # 如果服务没有配置api_key，使用默认api_key
-        if 'api_key' not in service_config and default_api_key:
-            service_config['api_key'] = default_api_key
-        
-        # 验证必要的配置项
-        required_fields = {
-            'oneapi': ['api_key', 'api_base', 'model'],
-            'openai': ['api_key', 'api_base', 'model'],
-            'gemini': ['api_key'],
-            'azure': ['api_key', 'api_base'],
-            'xunfei': ['app_id', 'api_key', 'api_secret']
-        }
-        
-        # 检查必要的配置项
-        if service_name in required_fields:
-            missing_fields = [
-                field for field in required_fields[service_name]
-                if not service_config.get(field)
-            ]
-            if missing_fields:
-                raise Exception(
-                    f"AI服务 {service_name} 缺少必要的配置项: {', '.join(missing_fields)}"
-                )
-        
-        # 返回完整的配置
-        return {
-            'name': service_config.get('name', service_name.title()),
-            'service': service_name,
-            **service_config
-        }
-    
-    def get_logging_config(self) -> Dict[str, Any]:
+        return self._snapshot.get_ai_service(service_name)
+
+    def get_logging_config(self) -> Mapping[str, Any]:
         """获取日志配置"""
-        return self._config.get('logging', {'level': 'info'})
-    
-    def get_security_config(self) -> Dict[str, Any]:
+        return self._snapshot.get('logging', {'level': 'info'})
+
+    def get_security_config(self) -> Mapping[str, Any]:
         """获取安全配置"""
         return self._config.get('security', {})
-    
-    def get_redis_config(self) -> Dict[str, Any]:
+
+    def get_redis_config(self) -> Mapping[str, Any]:
         """获取Redis配置"""
         return self._config.get('redis', {})
-    
-    def get_rate_limit_config(self) -> Dict[str, Any]:
+
+    def get_rate_limit_config(self) -> Mapping[str, Any]:
         """获取限流配置"""
-        return self._config.get('rate_limit', {}) 
\ No newline at end of file
+        return self._config.get('rate_limit', {})
+
+    def get_cache_config(self) -> Mapping[str, Any]:
+        """获取总结缓存配置"""
+        return self._config.get('cache', {})
+
+    def get_http_client_config(self) -> Mapping[str, Any]:
+        """获取HTTP客户端连接池配置"""
+        return self._config.get('http_client', {})
+
+    def get_ai_client_config(self) -> Mapping[str, Any]:
+        """获取AI客户端连接池配置"""
+        return self._config.get('ai_client', {})
+
+    def get_long_document_config(self) -> Mapping[str, Any]:
+        """获取长文档分块总结配置"""
+        return self._config.get('long_document', {})
+
+    def get_batch_config(self) -> Mapping[str, Any]:
+        """获取批量总结配置"""
+        return self._config.get('batch', {})
+
+    def get_upload_config(self) -> Mapping[str, Any]:
+        """获取文件上传配置"""
+        return self._config.get('upload', {})
+
+    def get_executor_config(self) -> Mapping[str, Any]:
+        """获取任务执行器配置"""
+        return self._config.get('executor', {})
+
+    def get_extraction_config(self) -> Mapping[str, Any]:
+        """获取文件内容提取预算配置"""
+        return self._config.get('extraction', {})
+
+    def get_excel_config(self) -> Mapping[str, Any]:
+        """获取 Excel 内容提取配置"""
+        return self._config.get('excel', {})
+
+    def get_html_extractor_config(self) -> Mapping[str, Any]:
+        """获取HTML正文提取配置"""
+        return self._config.get('html_extractor', {})
+
+    def get_tracing_config(self) -> Mapping[str, Any]:
+        """获取请求追踪配置"""
+        return self._config.get('tracing', {})
+
+    def get_history_config(self) -> Mapping[str, Any]:
+        """获取URL历史记录配置"""
+        return self._config.get('history', {})
+
+    def get_llm_concurrency_config(self) -> Mapping[str, Any]:
+        """获取模型调用自适应并发配置"""
+        return self._config.get('llm_concurrency', {})
+
+    def get_server_config(self) -> Mapping[str, Any]:
+        """获取生产模式服务进程配置"""
+        return self._config.get('server', {})
+
+    def get_config_reload_config(self) -> Mapping[str, Any]:
+        """获取配置热加载配置"""
+        return self._config.get('config_reload', {})
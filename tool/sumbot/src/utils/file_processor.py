@@ -1,9 +1,11 @@
+import codecs
+import importlib
+import io
+import mmap
 import os
-from docx import Document
-import markdown
-import fitz
-from openpyxl import load_workbook
-from pptx import Presentation
+import zipfile
+from src.utils.config_manager import ConfigManager
+from src.utils.text_splitter import estimate_tokens
 
 EXTENSION_TO_TYPE = {
     'pdf': 'pdf',
@@ -14,70 +16,248 @@ EXTENSION_TO_TYPE = {
     'ppt': 'ppt', 'pptx': 'ppt'
 }
 
+# 文本文件每次从 mmap 中解码的字节数
+TEXT_BLOCK_SIZE = 64 * 1024
+
+# Office Open XML 压缩包内的目录与文件类型对应关系
+OOXML_DIR_TO_TYPE = {
+    'word/': 'docx',
+    'xl/': 'excel',
+    'ppt/': 'ppt'
+}
+
+# 文件类型 -> (读取方法名, 块分隔符)，各解析库在读取方法中首次使用时才导入
+EXTRACTORS = {
+    'pdf': ('iter_pdf', "\n"),
+    'docx': ('iter_word', "\n"),
+    'md': ('iter_txt', ""),
+    'excel': ('iter_excel', "\n"),
+    'txt': ('iter_txt', ""),
+    'ppt': ('iter_ppt', "\n"),
+}
+
+def _import_optional(modules, package):
+    """
+    按顺序导入第一个可用的模块
+    :param modules: 候选模块名
+    :param package: 缺失时提示安装的包名
+    """
+    for name in modules:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    raise RuntimeError(f"缺少文件解析依赖，请安装 {package}")
+
+def _looks_like_text(head):
+    """判断文件开头是否为 UTF-8 文本（允许末尾被截断的多字节字符）"""
+    if b'\x00' in head:
+        return False
+    try:
+        head.decode('utf-8')
+        return True
+    except UnicodeDecodeError as e:
+        return e.start >= len(head) - 3
+
 class FileProcessor:
-    def extract_content(self, file_path):
-        """提取文件内容"""
-        _, ext = os.path.splitext(file_path)
+    def __init__(self):
+        self.excel_config = ConfigManager().get_excel_config()
+
+    def detect_file_type(self, file_path, filename=None):
+        """
+        根据文件头魔数识别真实文件类型，不信任扩展名
+        :param file_path: 文件路径
+        :param filename: 原始文件名，仅用于区分 txt 和 md
+        :return: 文件类型
+        """
+        _, ext = os.path.splitext(filename or file_path)
         ext = ext.lower().strip('.')
         
-        file_type = EXTENSION_TO_TYPE.get(ext)
+        with open(file_path, 'rb') as f:
+            head = f.read(4096)
+        
+        if head.startswith(b'%PDF-'):
+            return 'pdf'
+        if head.startswith(b'PK\x03\x04'):
+            with zipfile.ZipFile(file_path) as zf:
+                names = zf.namelist()
+            for prefix, file_type in OOXML_DIR_TO_TYPE.items():
+                if any(name.startswith(prefix) for name in names):
+                    return file_type
+            raise ValueError(f"不支持的文件类型: {ext or 'zip'}")
+        if head.startswith(b'\xd0\xcf\x11\xe0'):
+            raise ValueError("不支持旧版 Office 格式（doc/xls/ppt），请另存为 docx/xlsx/pptx")
+        if _looks_like_text(head):
+            return 'md' if ext == 'md' else 'txt'
+        raise ValueError(f"不支持的文件类型: {ext}")
+
+    def extract_content(self, file_path, file_type=None, max_chars=None, max_tokens=None):
+        """
+        提取文件内容
+        :param file_path: 文件路径
+        :param file_type: 文件类型，不指定时根据扩展名判断
+        :param max_chars: 可选的字符预算
+        :param max_tokens: 可选的 token 预算
+        """
+        return "".join(self.extract_content_stream(file_path, file_type, max_chars, max_tokens))
+
+    def extract_content_stream(self, file_path, file_type=None, max_chars=None, max_tokens=None):
+        """
+        按页或按块逐段产出文件内容，达到字符或 token 预算后提前停止
+        :param file_path: 文件路径
+        :param file_type: 文件类型，不指定时根据扩展名判断
+        :param max_chars: 可选的字符预算
+        :param max_tokens: 可选的 token 预算
+        """
         if not file_type:
-            raise ValueError(f"不支持的文件类型: {ext}")
+            _, ext = os.path.splitext(file_path)
+            ext = ext.lower().strip('.')
             
-        if file_type == 'pdf':
-            return self.read_pdf(file_path)
-        elif file_type == 'docx':
-            return self.read_word(file_path)
-        elif file_type == 'md':
-            return self.read_markdown(file_path)
-        elif file_type == 'excel':
-            return self.read_excel(file_path)
-        elif file_type == 'txt':
-            return self.read_txt(file_path)
-        elif file_type == 'ppt':
-            return self.read_ppt(file_path)
-        else:
+            file_type = EXTENSION_TO_TYPE.get(ext)
+            if not file_type:
+                raise ValueError(f"不支持的文件类型: {ext}")
+        
+        if file_type not in EXTRACTORS:
             raise ValueError(f"未知的文件类型: {file_type}")
+        method, separator = EXTRACTORS[file_type]
+        
+        remaining_chars = max_chars
+        remaining_tokens = max_tokens
+        blocks = getattr(self, method)(file_path)
+        try:
+            for index, block in enumerate(blocks):
+                if index and separator:
+                    block = separator + block
+                if remaining_chars is not None and len(block) > remaining_chars:
+                    block = block[:remaining_chars]
+                if remaining_tokens is not None:
+                    tokens = estimate_tokens(block)
+                    if tokens > remaining_tokens:
+                        block = block[:int(len(block) * remaining_tokens / tokens)]
+                if block:
+                    yield block
+                if remaining_chars is not None:
+                    remaining_chars -= len(block)
+                if remaining_tokens is not None:
+                    remaining_tokens -= estimate_tokens(block)
+                if (remaining_chars is not None and remaining_chars <= 0) or \
+                        (remaining_tokens is not None and remaining_tokens <= 0):
+                    break
+        finally:
+            # 提前停止时关闭底层文件
+            blocks.close()
+
+    def iter_pdf(self, file_path):
+        """逐页读取 PDF 文件内容"""
+        pymupdf = _import_optional(('pymupdf', 'fitz'), 'PyMuPDF')
+        with pymupdf.open(file_path) as doc:
+            for page in doc:
+                yield page.get_text()
+
+    def iter_word(self, file_path):
+        """逐段读取 Word 文档内容"""
+        docx = _import_optional(('docx',), 'python-docx')
+        doc = docx.Document(file_path)
+        for paragraph in doc.paragraphs:
+            yield paragraph.text
+
+    def iter_excel(self, file_path):
+        """
+        读取 Excel 文件内容
+        profile 模式输出每个工作表的列级概要和样本行，rows 模式逐行输出全部单元格
+        """
+        load_workbook = _import_optional(('openpyxl',), 'openpyxl').load_workbook
+        # 列级概要依赖 numpy，只在解析 Excel 时导入
+        from src.utils.table_profiler import profile_table
+        excel_config = self.excel_config
+        if excel_config.get('mode', 'profile') != 'profile':
+            wb = load_workbook(file_path, read_only=True)
+            try:
+                for sheet in wb:
+                    yield f"Sheet: {sheet.title}"
+                    for row in sheet.iter_rows(values_only=True):
+                        yield "\t".join(str(cell) if cell is not None else "" for cell in row)
+            finally:
+                wb.close()
+            return
+        
+        max_rows = excel_config.get('max_rows', 100000)
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet in wb:
+                rows = []
+                for row in sheet.iter_rows(values_only=True):
+                    if len(rows) >= max_rows:
+                        break
+                    rows.append(row)
+                total_rows = max(sheet.max_row or 0, len(rows))
+                yield "\n".join(profile_table(
+                    rows,
+                    sheet.title,
+                    top_k=excel_config.get('top_k', 5),
+                    sample_rows=excel_config.get('sample_rows', 5),
+                    max_columns=excel_config.get('max_columns', 50),
+                    total_rows=total_rows
+                ))
+        finally:
+            wb.close()
+
+    def iter_txt(self, file_path, block_size=TEXT_BLOCK_SIZE):
+        """
+        通过 mmap 分块读取文本文件内容
+        与文本模式读取一致，\r\n 和 \r 统一转换为 \n（块末尾的 \r 留到下一块再判断）
+        """
+        if os.path.getsize(file_path) == 0:
+            return
+        decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for offset in range(0, len(mm), block_size):
+                text = decoder.decode(mm[offset:offset + block_size])
+                if text:
+                    yield text
+            text = decoder.decode(b'', final=True)
+            if text:
+                yield text
+
+    def iter_ppt(self, file_path):
+        """逐个形状读取 PPT 文件内容"""
+        pptx = _import_optional(('pptx',), 'python-pptx')
+        prs = pptx.Presentation(file_path)
+        for slide in prs.slides:
+            for shape in slide.shapes:
+                if hasattr(shape, "text"):
+                    yield shape.text
 
     def read_pdf(self, file_path):
         """读取 PDF 文件内容"""
-        text = []
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                text.append(page.get_text())
-        return "\n".join(text)
+        return self.extract_content(file_path, 'pdf')
 
     def read_word(self, file_path):
         """读取 Word 文档内容"""
-        doc = Document(file_path)
-        return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        return self.extract_content(file_path, 'docx')
 
     def read_markdown(self, file_path):
         """读取 Markdown 文件内容"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return self.extract_content(file_path, 'md')
 
     def read_excel(self, file_path):
         """读取 Excel 文件内容"""
-        wb = load_workbook(file_path)
-        text = []
-        for sheet in wb:
-            text.append(f"Sheet: {sheet.title}")
-            for row in sheet.iter_rows(values_only=True):
-                text.append("\t".join(str(cell) if cell is not None else "" for cell in row))
-        return "\n".join(text)
+        return self.extract_content(file_path, 'excel')
 
     def read_txt(self, file_path):
         """读取文本文件内容"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return self.extract_content(file_path, 'txt')
 
     def read_ppt(self, file_path):
         """读取 PPT 文件内容"""
-        prs = Presentation(file_path)
-        text = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text.append(shape.text)
-        return "\n".join(text) 
\ No newline at end of file
+        return self.extract_content(file_path, 'ppt')
+
+def extract_file_content(file_path, file_type=None, max_chars=None, max_tokens=None):
+    """
+    提取文件内容的模块级入口，可被 pickle 后在进程池中执行
+    :param file_path: 文件路径
+    :param file_type: 文件类型
+    :param max_chars: 可选的字符预算
+    :param max_tokens: 可选的 token 预算
+    """
+    return FileProcessor().extract_content(file_path, file_type, max_chars, max_tokens)
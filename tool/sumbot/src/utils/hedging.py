@@ -0,0 +1,73 @@
+from collections import deque
+from typing import Deque, Dict, Optional
+from src.utils.config_manager import ConfigManager, ConfigSnapshot
+
+
+class HedgePolicy:
+    """
+    对冲请求策略：按服务记录最近成功调用的延迟，调用超过该延迟的指定分位数仍未返回时再发出一个副本
+    每个请求积累 budget 个令牌，每次对冲消耗一个，对冲请求所占比例不超过 budget
+    """
+
+    def __init__(self):
+        config = ConfigManager()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self._apply_config(config.snapshot)
+        config.subscribe(self._apply_config)
+
+    def _apply_config(self, snapshot: ConfigSnapshot) -> None:
+        hedging_config = snapshot.get('hedging', {})
+        self.enabled = hedging_config.get('enabled', False)
+        self.percentile = hedging_config.get('percentile', 95)
+        self.min_delay = hedging_config.get('min_delay', 1.0)
+        self.max_delay = hedging_config.get('max_delay', 20.0)
+        self.min_samples = hedging_config.get('min_samples', 20)
+        self.samples = hedging_config.get('samples', 200)
+        self.budget = hedging_config.get('budget', 0.1)
+        self.burst = hedging_config.get('burst', 10)
+        self.alternate_provider = hedging_config.get('alternate_provider', True)
+        for name, latencies in self._latencies.items():
+            self._latencies[name] = deque(latencies, maxlen=self.samples)
+        self._tokens = min(self._tokens, self.burst)
+
+    def observe(self, service_name: str, latency: float) -> None:
+        """
+        记录一次成功调用的延迟
+        :param service_name: 服务名称
+        :param latency: 调用耗时（秒）
+        """
+        latencies = self._latencies.get(service_name)
+        if latencies is None:
+            latencies = self._latencies[service_name] = deque(maxlen=self.samples)
+        latencies.append(latency)
+
+    def delay(self, service_name: str) -> Optional[float]:
+        """
+        发出对冲请求前等待的秒数，同时为本次请求积累对冲预算
+        :param service_name: 首个请求使用的服务
+        :return: 等待秒数，未启用或样本不足时返回 None
+        """
+        if not self.enabled:
+            return None
+        self._tokens = min(self.burst, self._tokens + self.budget)
+        latencies = self._latencies.get(service_name)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+        return min(max(value, self.min_delay), self.max_delay)
+
+    def try_spend(self) -> bool:
+        """
+        消耗一次对冲预算
+        :return: 预算不足时返回 False，不发出对冲请求
+        """
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+# 进程级对冲策略
+hedge_policy = HedgePolicy()
@@ -0,0 +1,336 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+
+logger = get_logger("sumbot.history_store")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS history ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, tags TEXT NOT NULL DEFAULT '[]', "
+    "created_at REAL NOT NULL, latency_ms REAL, summary_id TEXT, status TEXT NOT NULL, request_id TEXT)",
+    "CREATE TABLE IF NOT EXISTS history_tags ("
+    "history_id INTEGER NOT NULL REFERENCES history(id) ON DELETE CASCADE, tag TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_history_url ON history(url)",
+    "CREATE INDEX IF NOT EXISTS idx_history_created_at ON history(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_history_latency ON history(latency_ms)",
+    "CREATE INDEX IF NOT EXISTS idx_history_summary_id ON history(summary_id)",
+    "CREATE INDEX IF NOT EXISTS idx_history_tags_tag ON history_tags(tag, history_id)",
+    # 已导入或由数据库导出的 Markdown 历史文件，避免重复导入
+    "CREATE TABLE IF NOT EXISTS markdown_files (name TEXT PRIMARY KEY, imported_at REAL NOT NULL)",
+)
+
+MARKDOWN_FILE_PATTERN = re.compile(r'^\d{8}\.md$')
+# 原有历史文件的单行记录: - URL | YYYY-MM-DD HH:MM:SS | #标签1 #标签2
+MARKDOWN_RECORD_PATTERN = re.compile(r'^- (.+) \| (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \|(.*)$')
+
+# 写线程的停止标记
+_STOP = object()
+
+
+def format_markdown_record(url: str, created_at: float, tags: List[str]) -> str:
+    """按原有历史文件格式生成一行记录"""
+    current_time = datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M:%S")
+    tags_str = " ".join([f"#{tag}" for tag in tags])
+    return f"\n- {url} | {current_time} | {tags_str}"
+
+
+def parse_markdown_records(text: str) -> List[tuple]:
+    """
+    解析原有历史文件，跳过无法识别的行
+    :return: (url, created_at, tags) 列表
+    """
+    records = []
+    for line in text.split('\n'):
+        match = MARKDOWN_RECORD_PATTERN.match(line.rstrip('\r'))
+        if not match:
+            continue
+        url, current_time, tags_str = match.groups()
+        created_at = datetime.strptime(current_time, "%Y-%m-%d %H:%M:%S").timestamp()
+        tags = [tag[1:] for tag in tags_str.split() if tag.startswith('#') and len(tag) > 1]
+        records.append((url, created_at, tags))
+    return records
+
+
+class HistoryStore:
+    """
+    基于 SQLite（WAL 模式）的 URL 处理历史
+    请求只把记录放入内存队列，由后台线程批量写入，不占用请求的处理时间
+    """
+
+    def __init__(self):
+        history_config = ConfigManager().get_history_config()
+        self.enabled = history_config.get('enabled', True)
+        self.path = history_config.get('db_path', 'output/urlhistory/history.db')
+        self.markdown_dir = history_config.get('markdown_dir', 'output/urlhistory')
+        self.batch_size = history_config.get('batch_size', 100)
+        self.flush_interval = history_config.get('flush_interval', 1.0)
+        self._queue: queue.Queue = queue.Queue(maxsize=history_config.get('queue_size', 10000))
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _ensure_schema(self) -> None:
+        if self._initialized:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = self._connect()
+        try:
+            # WAL 模式下读写互不阻塞，写线程提交时查询仍可进行
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+            self._import_markdown(conn)
+        finally:
+            conn.close()
+        self._initialized = True
+
+    def _import_markdown(self, conn: sqlite3.Connection) -> None:
+        """
+        把迁移前按日期追加写入的 Markdown 历史文件导入数据库，每个文件只导入一次
+        导出会覆盖同名文件，必须先导入，否则迁移前的记录会丢失
+        """
+        if not os.path.isdir(self.markdown_dir):
+            return
+        imported = {row[0] for row in conn.execute("SELECT name FROM markdown_files")}
+        for name in sorted(os.listdir(self.markdown_dir)):
+            if name in imported or not MARKDOWN_FILE_PATTERN.match(name):
+                continue
+            with open(os.path.join(self.markdown_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+                records = parse_markdown_records(f.read())
+            try:
+                with conn:
+                    # 先登记文件，多个进程同时导入时只有一个能成功
+                    conn.execute("INSERT INTO markdown_files (name, imported_at) VALUES (?, ?)", (name, time.time()))
+                    self._write_records(conn, [
+                        (url, tags, created_at, None, None, "legacy", None)
+                        for url, created_at, tags in records
+                    ])
+            except sqlite3.IntegrityError:
+                continue
+            logger.info(f"已导入历史文件 {name}: {len(records)} 条记录")
+
+    def record(
+        self,
+        url: str,
+        tags: Optional[List[str]] = None,
+        latency_ms: Optional[float] = None,
+        summary_id: Optional[str] = None,
+        status: str = "success",
+        request_id: Optional[str] = None
+    ) -> None:
+        """
+        记录一次URL处理，立即返回
+        :param url: 处理的URL
+        :param tags: 标签列表
+        :param latency_ms: 处理耗时（毫秒）
+        :param summary_id: 总结ID（内容哈希）
+        :param status: 处理结果：success、cache_hit 或 error
+        :param request_id: 请求ID
+        """
+        if not self.enabled:
+            return
+        self._start_writer()
+        try:
+            self._queue.put_nowait((url, list(tags or []), time.time(), latency_ms, summary_id, status, request_id))
+        except queue.Full:
+            logger.warning(f"历史记录队列已满，丢弃记录: {url}")
+
+    def _start_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name="sumbot-history", daemon=True)
+                self._writer.start()
+
+    def _run_writer(self) -> None:
+        """后台写线程：攒够一批或等待超时后在一个事务中写入"""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_records(conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        """在调用方的事务中写入记录和标签索引"""
+        for url, tags, created_at, latency_ms, summary_id, status, request_id in batch:
+            cursor = conn.execute(
+                "INSERT INTO history (url, tags, created_at, latency_ms, summary_id, status, request_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, json.dumps(tags, ensure_ascii=False), created_at, latency_ms, summary_id, status, request_id)
+            )
+            conn.executemany(
+                "INSERT INTO history_tags (history_id, tag) VALUES (?, ?)",
+                [(cursor.lastrowid, tag) for tag in tags]
+            )
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        try:
+            with conn:
+                self._write_records(conn, batch)
+        except sqlite3.Error as e:
+            logger.error(f"写入历史记录失败: {str(e)}, 丢弃 {len(batch)} 条")
+
+    def close(self, timeout: float = 5) -> None:
+        """写入队列中剩余的记录并停止写线程"""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def query(
+        self,
+        url: Optional[str] = None,
+        tag: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        min_latency_ms: Optional[float] = None,
+        summary_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        查询历史记录，按时间倒序（同步执行，异步代码中请放到线程池）
+        :param url: 精确匹配的URL
+        :param tag: 包含的标签
+        :param start: 起始时间戳（含）
+        :param end: 结束时间戳（不含）
+        :param min_latency_ms: 最小耗时（毫秒）
+        :param summary_id: 总结ID
+        :param status: 处理结果
+        :param limit: 返回条数
+        :param offset: 跳过条数
+        """
+        self._ensure_schema()
+        conditions, params = [], []
+        if url:
+            conditions.append("h.url = ?")
+            params.append(url)
+        if tag:
+            conditions.append("h.id IN (SELECT history_id FROM history_tags WHERE tag = ?)")
+            params.append(tag)
+        if start is not None:
+            conditions.append("h.created_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("h.created_at < ?")
+            params.append(end)
+        if min_latency_ms is not None:
+            conditions.append("h.latency_ms >= ?")
+            params.append(min_latency_ms)
+        if summary_id:
+            conditions.append("h.summary_id = ?")
+            params.append(summary_id)
+        if status:
+            conditions.append("h.status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            "SELECT h.url, h.tags, h.created_at, h.latency_ms, h.summary_id, h.status, h.request_id "
+            f"FROM history h {where} ORDER BY h.created_at DESC LIMIT ? OFFSET ?"
+        )
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params + [limit, offset]).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                "url": row[0],
+                "tags": json.loads(row[1]),
+                "created_at": row[2],
+                "latency_ms": row[3],
+                "summary_id": row[4],
+                "status": row[5],
+                "request_id": row[6],
+            }
+            for row in rows
+        ]
+
+    def export_markdown(self, output_dir: Optional[str] = None, date: Optional[str] = None) -> List[str]:
+        """
+        按日期重新生成 YYYYMMDD.md 历史文件，格式与原有文件一致（原有文件已在初始化时导入数据库）
+        :param output_dir: 输出目录，默认使用配置中的 markdown_dir
+        :param date: 只导出指定日期（YYYYMMDD），不指定时导出全部
+        :return: 生成的文件路径列表
+        """
+        self._ensure_schema()
+        output_dir = output_dir or self.markdown_dir
+        os.makedirs(output_dir, exist_ok=True)
+        sql = "SELECT url, tags, created_at FROM history"
+        params: list = []
+        if date:
+            day = datetime.strptime(date, "%Y%m%d")
+            sql += " WHERE created_at >= ? AND created_at < ?"
+            params = [day.timestamp(), day.timestamp() + 86400]
+        sql += " ORDER BY created_at, id"
+
+        files: Dict[str, List[str]] = {}
+        conn = self._connect()
+        try:
+            for url, tags, created_at in conn.execute(sql, params):
+                current_date = datetime.fromtimestamp(created_at).strftime("%Y%m%d")
+                files.setdefault(current_date, []).append(
+                    format_markdown_record(url, created_at, json.loads(tags))
+                )
+        finally:
+            conn.close()
+
+        paths = []
+        for current_date, records in files.items():
+            name = f"{current_date}.md"
+            path = os.path.join(output_dir, name)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("".join(records))
+            paths.append(path)
+        if os.path.abspath(output_dir) == os.path.abspath(self.markdown_dir):
+            # 导出的文件内容已在数据库中，登记后不再导入
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO markdown_files (name, imported_at) VALUES (?, ?)",
+                        [(os.path.basename(path), time.time()) for path in paths]
+                    )
+            finally:
+                conn.close()
+        return paths
+
+
+# 进程级历史存储
+history_store = HistoryStore()
@@ -0,0 +1,316 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+from bs4 import BeautifulSoup
+from fastapi import HTTPException
+from src.utils.logger import get_logger
+
+logger = get_logger("sumbot.html_extractor")
+
+# 正文段落所在的标签
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+WECHAT_BLOCK_TAGS = ['p'] + HEADING_TAGS + ['section']
+GENERAL_BLOCK_TAGS = ['p'] + HEADING_TAGS
+
+
+class HTMLExtractor(ABC):
+    """HTML正文提取后端接口，后端必须实现微信文章和一般网页两种提取规则"""
+
+    name = "base"
+
+    def extract(self, html: str, url: str) -> str:
+        """
+        按URL选择提取规则
+        :param html: 页面HTML
+        :param url: 页面URL
+        :return: 提取的正文
+        """
+        # 处理微信公众号文章
+        if 'mp.weixin.qq.com' in url:
+            return self.extract_wechat(html)
+        # 处理其他网页
+        return self.extract_general(html)
+
+    @abstractmethod
+    def extract_wechat(self, html: str) -> str:
+        """提取微信公众号文章"""
+
+    @abstractmethod
+    def extract_general(self, html: str) -> str:
+        """提取一般网页"""
+
+
+class BeautifulSoupExtractor(HTMLExtractor):
+    """基于 BeautifulSoup 纯 Python html.parser 的提取后端"""
+
+    name = "bs4"
+
+    def extract_wechat(self, html: str) -> str:
+        """
+        处理微信公众号文章
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        article_content = []
+        
+        # 获取标题（尝试多个可能的选择器）
+        title = (
+            soup.find('h1', class_='rich_media_title') or
+            soup.find('h1', id='activity-name') or
+            soup.find('h1')
+        )
+        if title:
+            article_content.append(f"标题：{title.get_text().strip()}")
+        
+        # 获取作者信息（尝试多个可能的选择器）
+        author = (
+            soup.find('a', class_='rich_media_meta rich_media_meta_link rich_media_meta_nickname') or
+            soup.find('span', class_='rich_media_meta_text') or
+            soup.find('a', id='js_name')
+        )
+        if author:
+            article_content.append(f"作者：{author.get_text().strip()}")
+        
+        # 获取文章内容（尝试多个可能的选择器）
+        article = (
+            soup.find('div', class_='rich_media_content') or
+            soup.find('div', id='js_content') or
+            soup.find('div', class_='content')
+        )
+        
+        if article:
+            # 移除所有脚本和样式
+            for element in article(['script', 'style']):
+                element.decompose()
+            
+            # 获取所有文本内容
+            paragraphs = article.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section'])
+            for p in paragraphs:
+                text = p.get_text().strip()
+                if text:  # 只添加非空文本
+                    article_content.append(text)
+            
+            # 如果没有找到段落，尝试直接获取文本
+            if not paragraphs:
+                text = article.get_text().strip()
+                if text:
+                    article_content.append(text)
+        
+        if not article_content:
+            # 如果仍然没有内容，尝试获取页面上的所有文本
+            texts = soup.stripped_strings
+            article_content = [text.strip() for text in texts if text.strip()]
+        
+        if not article_content:
+            raise HTTPException(
+                status_code=400,
+                detail="无法提取文章内容"
+            )
+        
+        return "\n".join(article_content)
+
+    def extract_general(self, html: str) -> str:
+        """
+        处理一般网页
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        # 移除脚本和样式
+        for script in soup(['script', 'style']):
+            script.decompose()
+        
+        # 获取标题
+        title = soup.find('title')
+        content = []
+        if title:
+            content.append(f"标题：{title.get_text().strip()}")
+        
+        # 获取主要内容
+        main_content = soup.find('main') or soup.find('article') or soup.find('body')
+        if main_content:
+            # 获取所有段落文本
+            paragraphs = main_content.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+            for p in paragraphs:
+                text = p.get_text().strip()
+                if text:  # 只添加非空文本
+                    content.append(text)
+        
+        if not content:
+            # 如果没有找到主要内容，则获取所有文本
+            content = [text.strip() for text in soup.stripped_strings]
+        
+        return "\n".join(content)
+
+
+class LxmlExtractor(HTMLExtractor):
+    """基于 lxml（libxml2，C实现）的提取后端，规则与 BeautifulSoupExtractor 一致"""
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html as lxml_html
+        self._etree = etree
+        self._html = lxml_html
+
+    def _parse(self, html: str):
+        # 统一按 UTF-8 字节解析，避免带编码声明的字符串被 lxml 拒绝
+        parser = self._html.HTMLParser(encoding='utf-8')
+        try:
+            return self._html.document_fromstring(html.encode('utf-8'), parser=parser)
+        except self._etree.ParserError:
+            return self._html.document_fromstring(b'<html></html>', parser=parser)
+
+    @staticmethod
+    def _find(root, *xpaths: str):
+        """按顺序尝试多个选择器，返回第一个匹配的元素（lxml 元素的真值取决于子节点，不能用 or 串联）"""
+        for xpath in xpaths:
+            found = root.xpath(xpath)
+            if found:
+                return found[0]
+        return None
+
+    @staticmethod
+    def _class_xpath(tag: str, class_name: str) -> str:
+        """与 BeautifulSoup 的 class_ 匹配规则一致：单个类名按词匹配，含空格时按整体匹配"""
+        if ' ' in class_name:
+            return f"//{tag}[normalize-space(@class)='{class_name}']"
+        return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+    @staticmethod
+    def _blocks(element, tags: List[str]) -> list:
+        return element.xpath("|".join(f".//{tag}" for tag in tags))
+
+    @classmethod
+    def _stripped_strings(cls, element) -> List[str]:
+        """与 BeautifulSoup 的 stripped_strings 一致：按文档顺序，跳过注释、脚本和样式中的文本"""
+        strings = []
+
+        def walk(node):
+            if isinstance(node.tag, str) and node.tag not in ('script', 'style', 'template') and node.text:
+                strings.append(node.text)
+            for child in node:
+                walk(child)
+                if child.tail:
+                    strings.append(child.tail)
+
+        walk(element)
+        return [text.strip() for text in strings if text.strip()]
+
+    @staticmethod
+    def _drop(element, tags: List[str]) -> None:
+        for node in element.xpath("|".join(f".//{tag}" for tag in tags)):
+            node.drop_tree()
+
+    def extract_wechat(self, html: str) -> str:
+        """
+        处理微信公众号文章
+        """
+        root = self._parse(html)
+        article_content = []
+
+        # 获取标题（尝试多个可能的选择器）
+        title = self._find(
+            root,
+            self._class_xpath('h1', 'rich_media_title'),
+            "//h1[@id='activity-name']",
+            "//h1"
+        )
+        if title is not None:
+            article_content.append(f"标题：{title.text_content().strip()}")
+
+        # 获取作者信息（尝试多个可能的选择器）
+        author = self._find(
+            root,
+            self._class_xpath('a', 'rich_media_meta rich_media_meta_link rich_media_meta_nickname'),
+            self._class_xpath('span', 'rich_media_meta_text'),
+            "//a[@id='js_name']"
+        )
+        if author is not None:
+            article_content.append(f"作者：{author.text_content().strip()}")
+
+        # 获取文章内容（尝试多个可能的选择器）
+        article = self._find(
+            root,
+            self._class_xpath('div', 'rich_media_content'),
+            "//div[@id='js_content']",
+            self._class_xpath('div', 'content')
+        )
+
+        if article is not None:
+            # 移除所有脚本和样式
+            self._drop(article, ['script', 'style'])
+
+            # 获取所有文本内容
+            paragraphs = self._blocks(article, WECHAT_BLOCK_TAGS)
+            for p in paragraphs:
+                text = p.text_content().strip()
+                if text:  # 只添加非空文本
+                    article_content.append(text)
+
+            # 如果没有找到段落，尝试直接获取文本
+            if not paragraphs:
+                text = article.text_content().strip()
+                if text:
+                    article_content.append(text)
+
+        if not article_content:
+            # 如果仍然没有内容，尝试获取页面上的所有文本
+            article_content = self._stripped_strings(root)
+
+        if not article_content:
+            raise HTTPException(
+                status_code=400,
+                detail="无法提取文章内容"
+            )
+
+        return "\n".join(article_content)
+
+    def extract_general(self, html: str) -> str:
+        """
+        处理一般网页
+        """
+        root = self._parse(html)
+
+        # 移除脚本和样式
+        self._drop(root, ['script', 'style'])
+
+        # 获取标题
+        title = self._find(root, "//title")
+        content = []
+        if title is not None:
+            content.append(f"标题：{title.text_content().strip()}")
+
+        # 获取主要内容
+        main_content = self._find(root, "//main", "//article", "//body")
+        if main_content is not None:
+            # 获取所有段落文本
+            paragraphs = self._blocks(main_content, GENERAL_BLOCK_TAGS)
+            for p in paragraphs:
+                text = p.text_content().strip()
+                if text:  # 只添加非空文本
+                    content.append(text)
+
+        if not content:
+            # 如果没有找到主要内容，则获取所有文本
+            content = self._stripped_strings(root)
+
+        return "\n".join(content)
+
+
+HTML_EXTRACTORS: Dict[str, Type[HTMLExtractor]] = {
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def get_html_extractor(backend: Optional[str] = None) -> HTMLExtractor:
+    """
+    按名称创建提取后端，lxml 不可用时回退到 bs4
+    :param backend: 后端名称（bs4/lxml）
+    """
+    backend = backend or "bs4"
+    extractor_cls = HTML_EXTRACTORS.get(backend)
+    if extractor_cls is None:
+        raise ValueError(f"未知的HTML解析后端: {backend}")
+    try:
+        return extractor_cls()
+    except ImportError as e:
+        logger.warning(f"HTML解析后端 {backend} 不可用，回退到 bs4: {str(e)}")
+        return BeautifulSoupExtractor()
@@ -0,0 +1,75 @@
+import asyncio
+import aiohttp
+from typing import Optional
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+
+logger = get_logger("sumbot.http_client")
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """根据配置创建带连接池的会话"""
+    http_config = ConfigManager().get_http_client_config()
+    connector = aiohttp.TCPConnector(
+        limit=http_config.get('limit', 100),
+        limit_per_host=http_config.get('limit_per_host', 10),
+        ttl_dns_cache=http_config.get('dns_cache_ttl', 300),
+        keepalive_timeout=http_config.get('keepalive_timeout', 30)
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=http_config.get('total_timeout', 30),
+        connect=http_config.get('connect_timeout', 5),
+        sock_read=http_config.get('read_timeout', 20)
+    )
+    logger.info(
+        f"创建HTTP连接池: limit={connector.limit}, "
+        f"limit_per_host={connector.limit_per_host}"
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers=DEFAULT_HEADERS
+    )
+
+
+def _session_usable() -> bool:
+    """会话存在、未关闭且属于当前事件循环"""
+    return (
+        _session is not None
+        and not _session.closed
+        and _session_loop is asyncio.get_running_loop()
+    )
+
+
+async def startup_http_session() -> None:
+    """应用启动时创建全局会话"""
+    get_http_session()
+
+
+async def close_http_session() -> None:
+    """应用关闭时释放全局会话和连接池"""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("HTTP连接池已关闭")
+    _session = None
+    _session_loop = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    获取全局共享会话
+    未经应用启动流程时（如脚本或测试中）按需创建
+    """
+    global _session, _session_loop
+    if not _session_usable():
+        _session = _create_session()
+        _session_loop = asyncio.get_running_loop()
+    return _session
@@ -1,46 +1,177 @@
 import os
+import json
+import atexit
+import queue
+import random
 import logging
+import logging.handlers
 from datetime import datetime
+from typing import Any, Dict, Optional
+from src.utils.metrics import LOG_DROPPED
+
+# 日志中需要脱敏的字段名（小写）
+SENSITIVE_KEYS = {'api_key', 'authorization', 'x-api-key', 'cookie', 'default_api_key', 'api_secret'}
+
+LOG_FORMAT = '[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，extra 中的 fields 合并为顶层字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时直接丢弃日志并计数，不阻塞调用方，也不为每条丢弃的日志输出错误堆栈"""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """停止时等待监听线程腾出队列空间再放入结束标记，队列已满时也能写完剩余日志"""
+
+    def enqueue_sentinel(self) -> None:
+        try:
+            self.queue.put(self._sentinel, timeout=5)
+        except queue.Full:
+            pass
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，extra 中的 fields 以JSON附加在消息后"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            message += " " + json.dumps(fields, ensure_ascii=False, default=str)
+        return message
+
+
+class DailyFileHandler(logging.FileHandler):
+    """按日期切换文件（sumbot_YYYYMMDD.log），只在后台监听线程中调用"""
+
+    def __init__(self, log_dir: str, prefix: str = "sumbot"):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.current_date = datetime.now().strftime('%Y%m%d')
+        super().__init__(self._path(self.current_date), encoding='utf-8', delay=True)
+
+    def _path(self, date: str) -> str:
+        return os.path.join(self.log_dir, f"{self.prefix}_{date}.log")
+
+    def emit(self, record: logging.LogRecord) -> None:
+        date = datetime.now().strftime('%Y%m%d')
+        if date != self.current_date:
+            self.current_date = date
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self._path(date))
+        super().emit(record)
+
+
+def _load_logging_config(listener=None) -> Dict[str, Any]:
+    """
+    读取日志配置，配置文件不可用时返回空配置
+    :param listener: 可选的配置重新加载回调
+    """
+    try:
+        from src.utils.config_manager import ConfigManager
+        config = ConfigManager()
+        if listener is not None:
+            config.subscribe(listener)
+        return config.get_logging_config()
+    except Exception:
+        return {}
+
 
 class Logger:
     _instance = None
     _initialized = False
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Logger, cls).__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
         if not self._initialized:
             self._initialized = True
             self._setup_logging()
-    
+
     def _setup_logging(self):
-        """配置日志记录"""
+        """
+        配置日志记录
+        业务代码只把记录放入队列，格式化和写文件在后台监听线程中进行，不阻塞事件循环
+        """
+        self.config = _load_logging_config(self._apply_config)
+
         # 创建日志目录
         log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "logs")
         os.makedirs(log_dir, exist_ok=True)
-        
-        # 获取当前日期的日志文件路径
-        log_file = os.path.join(log_dir, f"sumbot_{datetime.now().strftime('%Y%m%d')}.log")
-        
+
+        if self.config.get('format', 'text') == 'json':
+            formatter = JSONFormatter(datefmt=DATE_FORMAT)
+        else:
+            formatter = TextFormatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+
+        file_handler = DailyFileHandler(log_dir)
+        stream_handler = logging.StreamHandler()
+        for handler in (file_handler, stream_handler):
+            handler.setFormatter(formatter)
+
+        self.handlers = (file_handler, stream_handler)
+        self._start_listener()
+        atexit.register(lambda: self.listener.stop())
+        # fork 出的子进程（预加载应用的 worker、进程池）中没有监听线程，需要重新启动
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._start_listener)
+
         # 配置根日志记录器
-        logging.basicConfig(
-            level=logging.INFO,
-            format='[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        
-        # 配置uvicorn和FastAPI日志记录器
-        for logger_name in ["uvicorn", "uvicorn.access", "fastapi", "sumbot"]:
+        self._set_level()
+
+        # uvicorn和FastAPI日志记录器统一交给根记录器处理，避免重复输出
+        for logger_name in ["uvicorn", "uvicorn.access", "uvicorn.error", "fastapi", "sumbot"]:
             logger = logging.getLogger(logger_name)
-            logger.handlers = logging.getLogger().handlers
-    
+            logger.handlers = []
+            logger.propagate = True
+
+    def _set_level(self):
+        level = getattr(logging, str(self.config.get('level', 'info')).upper(), logging.INFO)
+        logging.getLogger().setLevel(level)
+
+    def _apply_config(self, snapshot):
+        """配置重新加载后更新日志级别、采样率和截断长度，格式和队列大小需要重启生效"""
+        self.config = snapshot.get('logging', {})
+        self._set_level()
+
+    def _start_listener(self):
+        """创建日志队列和后台监听线程，并替换根记录器的处理器"""
+        log_queue = queue.Queue(maxsize=self.config.get('queue_size', 10000))
+        self.listener = DrainingQueueListener(
+            log_queue, *self.handlers, respect_handler_level=True
+        )
+        self.listener.start()
+        logging.getLogger().handlers = [DroppingQueueHandler(log_queue)]
+
     def get_logger(self, name="sumbot"):
         """获取指定名称的日志记录器"""
         return logging.getLogger(name)
@@ -50,4 +181,40 @@ logger = Logger()
 
 def get_logger(name="sumbot"):
     """获取日志记录器的便捷方法"""
-    return logger.get_logger(name) 
\ No newline at end of file
+    return logger.get_logger(name)
+
+def redact(data: Any) -> Any:
+    """
+    递归脱敏字典中的密钥类字段
+    :param data: 字典、列表或其他值
+    :return: 脱敏后的副本
+    """
+    if isinstance(data, dict):
+        return {
+            key: "***" if str(key).lower() in SENSITIVE_KEYS else redact(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [redact(item) for item in data]
+    return data
+
+def truncate(text: str, max_chars: Optional[int] = None) -> str:
+    """
+    截断过长的日志内容
+    :param text: 原始文本
+    :param max_chars: 最大字符数，不指定时使用配置值
+    """
+    if max_chars is None:
+        max_chars = logger.config.get('body_max_chars', 1024)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...(共 {len(text)} 字符)"
+
+def should_sample(path: str) -> bool:
+    """
+    按路由采样率决定是否记录该请求的详细日志
+    :param path: 请求路径
+    """
+    sampling = logger.config.get('sampling', {})
+    rate = sampling.get('routes', {}).get(path, sampling.get('default', 1.0))
+    return rate >= 1.0 or random.random() < rate
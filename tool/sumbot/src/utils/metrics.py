@@ -0,0 +1,234 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# 耗时直方图的桶边界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# 文本长度直方图的桶边界（字符）
+LENGTH_BUCKETS = (100, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 500000, 1000000)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """指标基类，标签值组合作为键保存各序列的数据"""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """可增可减的当前值"""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def track(self, **labels) -> "_GaugeTracker":
+        """上下文管理器：进入时加一，退出时减一"""
+        return _GaugeTracker(self, labels)
+
+
+class _GaugeTracker:
+    def __init__(self, gauge: Gauge, labels: Dict[str, str]):
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self):
+        self.gauge.inc(**self.labels)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.gauge.dec(**self.labels)
+
+
+class Histogram(_Metric):
+    """固定桶边界的直方图"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 每个序列保存 [各桶计数（非累计，最后一个为 +Inf）, 总和]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """上下文管理器：记录代码块的耗时（秒）"""
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class MetricsRegistry:
+    """进程内指标注册表，按 Prometheus 文本格式输出"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标已存在: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# 进程级指标注册表
+registry = MetricsRegistry()
+
+URL_FETCH_SECONDS = registry.histogram(
+    "sumbot_url_fetch_seconds", "URL page download time in seconds"
+)
+EXTRACTION_SECONDS = registry.histogram(
+    "sumbot_extraction_seconds", "Text extraction time in seconds", ("source",)
+)
+LLM_SECONDS = registry.histogram(
+    "sumbot_llm_request_seconds", "LLM request latency in seconds", ("model", "mode")
+)
+CONTENT_LENGTH = registry.histogram(
+    "sumbot_content_length_chars", "Extracted content length in characters", ("source",), LENGTH_BUCKETS
+)
+COMPLETION_LENGTH = registry.histogram(
+    "sumbot_completion_length_chars", "LLM completion length in characters", ("model",), LENGTH_BUCKETS
+)
+CACHE_LOOKUPS = registry.counter(
+    "sumbot_cache_lookups_total", "Summary cache lookups", ("kind", "result")
+)
+ERRORS = registry.counter(
+    "sumbot_errors_total", "Errors by processing stage", ("stage",)
+)
+IN_FLIGHT = registry.gauge(
+    "sumbot_requests_in_flight", "Summarize requests currently in progress", ("endpoint",)
+)
+LLM_CONCURRENCY_LIMIT = registry.gauge(
+    "sumbot_llm_concurrency_limit", "Adaptive LLM concurrency limit", ("provider", "model")
+)
+LLM_RETRIES = registry.counter(
+    "sumbot_llm_retries_total", "LLM request retries", ("provider", "reason")
+)
+LLM_PROVIDER_HEALTHY = registry.gauge(
+    "sumbot_llm_provider_healthy", "Whether the LLM provider circuit is closed (1) or open (0)", ("provider",)
+)
+LLM_FAILOVERS = registry.counter(
+    "sumbot_llm_failovers_total", "LLM requests moved to the next provider after a failure", ("provider", "reason")
+)
+LLM_HEDGES = registry.counter(
+    "sumbot_llm_hedges_total", "Hedged LLM requests by result", ("result",)
+)
+LOG_DROPPED = registry.counter(
+    "sumbot_log_records_dropped_total", "Log records dropped because the log queue was full"
+)
@@ -0,0 +1,208 @@
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+from src.utils.adaptive_limiter import SUCCESS
+from src.utils.config_manager import ConfigManager, ConfigSnapshot
+from src.utils.logger import get_logger
+from src.utils.metrics import LLM_PROVIDER_HEALTHY
+
+logger = get_logger("sumbot.provider_router")
+
+# 当前请求的路径，用于按接口选择路由规则，由请求中间件设置
+current_route: ContextVar[Optional[str]] = ContextVar("sumbot_route", default=None)
+
+# 熔断状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """单个服务商最近一段时间的延迟、错误率和熔断状态"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency_ewma: Optional[float] = None
+        self.last_success = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.half_open = False
+        # 半开状态下探测请求的发出时间，同一时间只放行一个
+        self.probe_started: Optional[float] = None
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+
+    def _trim(self, now: float, window: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - window:
+            self._outcomes.popleft()
+
+    def error_rate(self, now: float, window: float) -> Tuple[float, int]:
+        """
+        :return: (窗口内错误率, 窗口内调用次数)
+        """
+        self._trim(now, window)
+        total = len(self._outcomes)
+        if not total:
+            return 0.0, 0
+        return sum(1 for _, ok in self._outcomes if not ok) / total, total
+
+    def observe(self, now: float, window: float, latency: float, ok: bool) -> None:
+        self._outcomes.append((now, ok))
+        self._trim(now, window)
+        if ok:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            self.last_success = now
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+
+    def reset_window(self) -> None:
+        self._outcomes.clear()
+
+    def state(self, now: float) -> str:
+        if now < self.open_until:
+            return OPEN
+        return HALF_OPEN if self.half_open else CLOSED
+
+    def score(self, now: float, window: float) -> Optional[float]:
+        """
+        选择时的代价估计，越小越优先：平均延迟除以成功率，即得到一次成功响应的预期耗时
+        窗口内没有成功调用的服务商返回 None，排在有成功记录的服务商之后
+        """
+        if self.latency_ewma is None or now - self.last_success > window:
+            return None
+        error_rate, _ = self.error_rate(now, window)
+        return self.latency_ewma / max(1.0 - error_rate, 0.05)
+
+    def try_probe(self, now: float, timeout: float) -> bool:
+        """
+        半开状态下申请发出探测请求
+        :param timeout: 探测请求超过该秒数仍未记录结果（如被取消）时允许重新探测
+        """
+        if self.state(now) != HALF_OPEN:
+            return False
+        if self.probe_started is not None and now - self.probe_started < timeout:
+            return False
+        self.probe_started = now
+        return True
+
+
+class ProviderRouter:
+    """
+    模型服务商路由：在可用的服务商中选择加权延迟最低的一个，
+    窗口内错误率过高或连续失败时熔断，熔断期满后放行请求探测，成功即恢复
+    未启用路由或请求自带 API 密钥时只使用默认服务商
+    """
+
+    def __init__(self):
+        config = ConfigManager()
+        self._health: Dict[str, ProviderHealth] = {}
+        self._apply_config(config.snapshot)
+        config.subscribe(self._apply_config)
+
+    def _apply_config(self, snapshot: ConfigSnapshot) -> None:
+        routing_config = snapshot.get('routing', {})
+        self.enabled = routing_config.get('enabled', False)
+        self.providers = routing_config.get('providers', ())
+        self.weights = routing_config.get('weights', {})
+        self.endpoints = routing_config.get('endpoints', {})
+        self.window = routing_config.get('window', 60)
+        self.min_requests = routing_config.get('min_requests', 5)
+        self.error_threshold = routing_config.get('error_threshold', 0.5)
+        self.consecutive_failures = routing_config.get('consecutive_failures', 3)
+        self.open_seconds = routing_config.get('open_seconds', 30)
+
+    def health(self, name: str) -> ProviderHealth:
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = ProviderHealth(name)
+            LLM_PROVIDER_HEALTHY.set(1, provider=name)
+        return health
+
+    def candidates(self, api_key: Optional[str] = None) -> List[str]:
+        """
+        当前请求按优先顺序排列的服务商，第一个失败时依次切换到后面的
+        :param api_key: 请求自带的 API 密钥，只对默认服务商有效
+        :return: 服务商名称列表（至少包含默认服务商）
+        """
+        snapshot = ConfigManager().snapshot
+        default = snapshot.get('ai_service', {}).get('default')
+        if not self.enabled or api_key:
+            return [default]
+
+        route = self.endpoints.get(current_route.get() or '', {})
+        names = route.get('providers') or self.providers or (default,)
+        weights = {**self.weights, **route.get('weights', {})}
+        usable = [name for name in dict.fromkeys(names) if self._usable(snapshot, name)]
+        if not usable:
+            return [default]
+
+        now = time.monotonic()
+        # 熔断期满的服务商每次只放行一个探测请求，探测请求优先发往该服务商
+        probe = next((name for name in usable if self.health(name).try_probe(now, self.open_seconds)), None)
+
+        def sort_key(name: str) -> Tuple[int, float]:
+            health = self.health(name)
+            if name == probe:
+                return 0, 0.0
+            if health.state(now) != CLOSED:
+                # 熔断中或正在探测的服务商只在其他服务商都失败时尝试，最先恢复的排在前面
+                return 3, health.open_until
+            score = health.score(now, self.window)
+            if score is None:
+                return 2, 0.0
+            return 1, score / max(weights.get(name, 1.0), 1e-6)
+
+        return sorted(usable, key=sort_key)
+
+    @staticmethod
+    def _usable(snapshot: ConfigSnapshot, name: str) -> bool:
+        """配置完整且兼容 OpenAI 接口（有 api_base 和 model）的服务商才参与路由"""
+        try:
+            service_config = snapshot.get_ai_service(name)
+        except Exception:
+            return False
+        return bool(service_config.get('api_base') and service_config.get('model'))
+
+    def record(self, name: str, latency: float, outcome: str) -> None:
+        """
+        记录一次调用结果并更新熔断状态
+        :param name: 服务商名称
+        :param latency: 调用耗时（秒）
+        :param outcome: 调用结果，SUCCESS 以外都计为失败
+        """
+        health = self.health(name)
+        now = time.monotonic()
+        ok = outcome == SUCCESS
+        health.observe(now, self.window, latency, ok)
+        state = health.state(now)
+        if state == HALF_OPEN:
+            health.probe_started = None
+
+        if ok:
+            # 熔断前发出、熔断期间才返回的请求不代表已恢复
+            if state == HALF_OPEN:
+                # 恢复后从头统计错误率，熔断前的失败不再计入
+                health.half_open = False
+                health.reset_window()
+                LLM_PROVIDER_HEALTHY.set(1, provider=name)
+                logger.info(f"服务商 {name} 已恢复")
+            return
+
+        error_rate, total = health.error_rate(now, self.window)
+        if health.half_open or health.consecutive_failures >= self.consecutive_failures or \
+                (total >= self.min_requests and error_rate >= self.error_threshold):
+            if health.state(now) != OPEN:
+                logger.warning(
+                    f"服务商 {name} 熔断 {self.open_seconds}s: 连续失败 {health.consecutive_failures} 次, "
+                    f"错误率 {error_rate:.0%} ({total} 次)"
+                )
+            health.open_until = now + self.open_seconds
+            # 熔断期满后进入半开状态，下一次调用决定恢复还是再次熔断
+            health.half_open = True
+            health.consecutive_failures = 0
+            LLM_PROVIDER_HEALTHY.set(0, provider=name)
+
+
+# 进程级服务商路由
+provider_router = ProviderRouter()
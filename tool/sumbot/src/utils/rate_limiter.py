@@ -0,0 +1,173 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from starlette.requests import Request
+from src.utils.ai_client_registry import hash_api_key
+from src.utils.config_manager import ConfigManager, ConfigSnapshot
+from src.utils.logger import get_logger
+from src.utils.redis_client import get_redis_client
+
+logger = get_logger("sumbot.rate_limiter")
+
+# 上传文件和批量请求占用更多抓取、解析和模型调用资源
+DEFAULT_ROUTE_COSTS = {
+    "/api/v1/summarize/file": 5,
+    "/api/v1/summarize/batch": 10,
+}
+
+# Redis 中原子执行的令牌桶：按服务器时间补充令牌，足够时扣减
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class MemoryBucketBackend:
+    """进程内令牌桶，按最近使用淘汰超出数量的键"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, cost: float, rate: float, capacity: float) -> Tuple[bool, float, float]:
+        """
+        :return: (是否允许, 剩余令牌数, 需要等待的秒数)
+        """
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            allowed, retry_after = True, 0.0
+        else:
+            allowed, retry_after = False, (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, tokens, retry_after
+
+
+class RedisBucketBackend:
+    """基于 Redis 的令牌桶，多个进程或实例共享限额"""
+
+    def __init__(self, client: Any, prefix: str = "sumbot:ratelimit:"):
+        self.prefix = prefix
+        self.client = client
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, key: str, cost: float, rate: float, capacity: float) -> Tuple[bool, float, float]:
+        allowed, tokens, retry_after = await self.script(keys=[self.prefix + key], args=[rate, capacity, cost])
+        return bool(int(allowed)), float(tokens), float(retry_after)
+
+
+class RateLimiter:
+    """
+    入站请求限流：按登记过的 API 密钥（其他请求按客户端IP）分桶，不同路由消耗不同数量的令牌
+    Redis 不可用时回退到进程内令牌桶，并在 redis_retry_interval 秒内不再访问 Redis
+    """
+
+    def __init__(self):
+        config = ConfigManager()
+        self.memory = MemoryBucketBackend()
+        self.redis: Optional[RedisBucketBackend] = None
+        self._redis_unavailable_until = 0.0
+        self._apply_config(config.snapshot)
+        config.subscribe(self._apply_config)
+
+    def _apply_config(self, snapshot: ConfigSnapshot) -> None:
+        """读取限流参数，配置重新加载后同样调用，已有的令牌桶保留"""
+        rate_limit_config = snapshot.get('rate_limit', {})
+        self.enabled = rate_limit_config.get('enabled', True)
+        per_minute = rate_limit_config.get('per_minute', 60)
+        self.rate = per_minute / 60
+        self.capacity = rate_limit_config.get('burst', per_minute)
+        self.route_costs = rate_limit_config.get('route_costs', DEFAULT_ROUTE_COSTS)
+        self.path_prefix = rate_limit_config.get('path_prefix', '/api/')
+        self.trust_forwarded_for = rate_limit_config.get('trust_forwarded_for', False)
+        self.memory.max_keys = rate_limit_config.get('max_keys', 100000)
+        self.redis_retry_interval = rate_limit_config.get('redis_retry_interval', 30)
+        # 只有登记过的密钥单独分桶，只保存哈希
+        self.api_key_hashes = frozenset(hash_api_key(key) for key in rate_limit_config.get('api_keys', ()) if key)
+
+        if rate_limit_config.get('backend', 'memory') != 'redis':
+            self.redis = None
+        elif self.redis is None:
+            client = get_redis_client()
+            if client is None:
+                logger.warning("未安装 redis，限流使用进程内令牌桶")
+            else:
+                self.redis = RedisBucketBackend(client)
+
+    def cost(self, path: str) -> Optional[float]:
+        """
+        请求消耗的令牌数，不受限流的路径返回 None
+        :param path: 请求路径
+        """
+        if not path.startswith(self.path_prefix):
+            return None
+        # 单次请求的消耗不超过桶容量，否则永远无法通过
+        return min(self.route_costs.get(path, 1), self.capacity)
+
+    def client_key(self, request: Request) -> str:
+        """
+        限流键：请求头中的 API 密钥在 api_keys 中登记过时按密钥分桶，否则按客户端IP分桶
+        未登记的密钥不能作为分桶依据，否则每次更换请求头即可绕过限流
+        """
+        if self.api_key_hashes:
+            authorization = request.headers.get('authorization', '')
+            api_key = request.headers.get('x-api-key') or (
+                authorization[7:].strip() if authorization.lower().startswith('bearer ') else None
+            )
+            if api_key:
+                key_hash = hash_api_key(api_key)
+                if key_hash in self.api_key_hashes:
+                    return f"key:{key_hash}"
+        if self.trust_forwarded_for:
+            forwarded = request.headers.get('x-forwarded-for')
+            if forwarded:
+                return f"ip:{forwarded.split(',')[0].strip()}"
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def check(self, request: Request) -> Tuple[bool, float, float]:
+        """
+        检查并扣减请求的令牌
+        :return: (是否允许, 剩余令牌数, 需要等待的秒数)
+        """
+        cost = self.cost(request.url.path)
+        if not self.enabled or cost is None:
+            return True, self.capacity, 0.0
+
+        key = self.client_key(request)
+        if self.redis is not None and time.monotonic() >= self._redis_unavailable_until:
+            try:
+                return await self.redis.acquire(key, cost, self.rate, self.capacity)
+            except Exception as e:
+                # 故障期间跳过 Redis，避免每个请求都等待连接超时
+                logger.warning(
+                    f"Redis 限流不可用，{self.redis_retry_interval}s 内使用进程内令牌桶: {str(e)}"
+                )
+                self._redis_unavailable_until = time.monotonic() + self.redis_retry_interval
+        return await self.memory.acquire(key, cost, self.rate, self.capacity)
+
+
+# 进程级限流器
+rate_limiter = RateLimiter()
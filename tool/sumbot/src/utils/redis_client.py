@@ -0,0 +1,47 @@
+from typing import Any, Optional
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+
+logger = get_logger("sumbot.redis_client")
+
+_client: Optional[Any] = None
+
+
+def get_redis_client() -> Optional[Any]:
+    """
+    获取进程级共享的 Redis 客户端（首次调用时创建，连接在首次使用时建立）
+    :return: redis.asyncio.Redis，未安装 redis 时返回 None
+    """
+    global _client
+    if _client is None:
+        # 只在限流或缓存启用 Redis 时才导入客户端库
+        try:
+            import redis.asyncio as aioredis
+            from redis.asyncio.retry import Retry
+            from redis.backoff import NoBackoff
+        except ImportError:
+            return None
+        redis_config = ConfigManager().get_redis_config()
+        socket_timeout = redis_config.get('socket_timeout', 0.5)
+        _client = aioredis.Redis(
+            host=redis_config.get('host', 'localhost'),
+            port=redis_config.get('port', 6379),
+            db=redis_config.get('db', 0),
+            password=redis_config.get('password'),
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            # 调用方在失败时回退到本地实现，不在客户端内重试，避免 Redis 故障时请求被拖慢
+            retry=Retry(NoBackoff(), redis_config.get('retries', 0))
+        )
+    return _client
+
+
+async def close_redis_client() -> None:
+    """关闭共享的 Redis 客户端"""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"关闭 Redis 客户端失败: {str(e)}")
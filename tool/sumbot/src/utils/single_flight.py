@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """一次进行中的共享调用"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用：同一时刻只有一个任务真正执行，其余调用等待它的结果
+    - 任务完成（成功、失败或取消）后立即移除，之后的调用重新执行，错误不会被缓存
+    - 单个等待者被取消不影响其他等待者；最后一个等待者离开时取消共享任务
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.stats = {
+            'executed': 0,
+            'coalesced': 0,
+        }
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行或加入相同键的调用
+        :param key: 调用键
+        :param func: 返回协程的无参函数，只有首个调用者的 func 会被执行
+        :return: 共享任务的结果
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call))
+            self.stats['executed'] += 1
+        else:
+            self.stats['coalesced'] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # 所有等待者都已离开时，避免出现未读取异常的警告
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,138 @@
+"""
+启动开销分析：在独立进程中导入应用，记录每个模块的导入耗时和常驻内存增量
+用法: python -m src.utils.startup_profiler [模块名] [--top N] [--group] [--budget-ms MS] [--budget-mb MB]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import psutil
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class ImportProfiler:
+    """
+    在 sys.meta_path 最前面插入的查找器，包装每个模块的 exec_module，
+    记录累计耗时和内存增量，减去子模块部分得到模块自身的开销
+    """
+
+    def __init__(self):
+        self.process = psutil.Process()
+        self.records: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                # 内置和冻结模块的加载器是类本身，多个模块共用，不做包装
+                if spec.loader is not None and not isinstance(spec.loader, type):
+                    self._wrap(spec.loader, name)
+                return spec
+        return None
+
+    def _wrap(self, loader, name: str) -> None:
+        exec_module = getattr(loader, 'exec_module', None)
+        if exec_module is None:
+            return
+
+        def timed_exec_module(module):
+            record = {"module": name, "children_ms": 0.0, "children_kb": 0}
+            self._stack.append(record)
+            start_rss = self.process.memory_info().rss
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                record["cumulative_ms"] = (time.perf_counter() - start) * 1000
+                record["cumulative_kb"] = (self.process.memory_info().rss - start_rss) // 1024
+                record["self_ms"] = record["cumulative_ms"] - record["children_ms"]
+                record["self_kb"] = record["cumulative_kb"] - record["children_kb"]
+                self._stack.pop()
+                if self._stack:
+                    self._stack[-1]["children_ms"] += record["cumulative_ms"]
+                    self._stack[-1]["children_kb"] += record["cumulative_kb"]
+                self.records.append(record)
+
+        try:
+            loader.exec_module = timed_exec_module
+        except AttributeError:
+            pass
+
+    def profile(self, module: str) -> Dict[str, Any]:
+        """
+        导入模块并返回总耗时、内存增量和各模块记录
+        :param module: 要导入的模块名，如 src.main
+        """
+        start_rss = self.process.memory_info().rss
+        start = time.perf_counter()
+        sys.meta_path.insert(0, self)
+        try:
+            __import__(module)
+        finally:
+            sys.meta_path.remove(self)
+        return {
+            "module": module,
+            "total_ms": (time.perf_counter() - start) * 1000,
+            "total_kb": (self.process.memory_info().rss - start_rss) // 1024,
+            "rss_mb": self.process.memory_info().rss / 1024 / 1024,
+            "records": self.records,
+        }
+
+
+def group_by_package(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按顶层包汇总模块自身的开销，各包之和等于总开销"""
+    packages: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        name = record["module"].split('.')[0]
+        package = packages.setdefault(name, {"module": name, "self_ms": 0.0, "self_kb": 0, "modules": 0})
+        package["self_ms"] += record["self_ms"]
+        package["self_kb"] += record["self_kb"]
+        package["modules"] += 1
+    return list(packages.values())
+
+
+def print_report(result: Dict[str, Any], top: int = 20, group: bool = False) -> None:
+    rows = group_by_package(result["records"]) if group else result["records"]
+    rows = sorted(rows, key=lambda row: row["self_ms"], reverse=True)[:top]
+    print(f"导入 {result['module']}: {result['total_ms']:.0f} ms, 内存增量 {result['total_kb'] / 1024:.1f} MB, "
+          f"进程常驻内存 {result['rss_mb']:.1f} MB, 模块数 {len(result['records'])}")
+    print(f"{'自身耗时(ms)':>12} {'自身内存(KB)':>12}  {'包' if group else '模块'}")
+    for row in rows:
+        suffix = f" ({row['modules']} 个模块)" if group else ""
+        print(f"{row['self_ms']:>12.1f} {row['self_kb']:>12}  {row['module']}{suffix}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="分析应用启动时的模块导入开销")
+    parser.add_argument('module', nargs='?', default='src.main', help='要导入的模块')
+    parser.add_argument('--top', type=int, default=20, help='显示开销最大的前N项')
+    parser.add_argument('--group', action='store_true', help='按顶层包汇总')
+    parser.add_argument('--budget-ms', type=float, help='导入耗时预算（毫秒），超出时返回非零退出码')
+    parser.add_argument('--budget-mb', type=float, help='进程常驻内存预算（MB），超出时返回非零退出码')
+    args = parser.parse_args()
+
+    # 与 run.py 相同的导入路径
+    sys.path.insert(0, ROOT_DIR)
+    sys.path.append(os.path.join(ROOT_DIR, "src"))
+
+    result = ImportProfiler().profile(args.module)
+    print_report(result, args.top, args.group)
+
+    over_budget = []
+    if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+        over_budget.append(f"导入耗时 {result['total_ms']:.0f} ms 超出预算 {args.budget_ms:.0f} ms")
+    if args.budget_mb is not None and result["rss_mb"] > args.budget_mb:
+        over_budget.append(f"常驻内存 {result['rss_mb']:.1f} MB 超出预算 {args.budget_mb:.0f} MB")
+    for message in over_budget:
+        print(message)
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
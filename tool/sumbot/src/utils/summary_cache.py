@@ -0,0 +1,368 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+from src.utils.redis_client import get_redis_client
+
+logger = get_logger("sumbot.summary_cache")
+
+# 规范化URL时丢弃的跟踪参数
+TRACKING_PARAMS = {
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'spm', 'from', 'isappinstalled', 'share_token', 'ref', 'ref_src'
+}
+
+# 微信文章只有这些参数决定文章本身，其余都是分享场景参数
+WECHAT_KEEP_PARAMS = {'__biz', 'mid', 'idx', 'sn'}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化URL，使同一篇文章的不同分享链接得到相同的缓存键
+    :param url: 原始URL
+    :return: 规范化后的URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if netloc == 'mp.weixin.qq.com':
+        query = [(k, v) for k, v in query if k in WECHAT_KEEP_PARAMS]
+    else:
+        query = [(k, v) for k, v in query if k.lower() not in TRACKING_PARAMS]
+    query.sort()
+
+    path = parts.path or '/'
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+def hash_content(content: str) -> str:
+    """计算提取内容的哈希"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheTier:
+    """进程内 LRU 缓存层"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at and expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else 0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCacheTier:
+    """基于 SQLite 的持久化缓存层，所有IO都在线程池中执行"""
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = asyncio.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # sqlite3 连接的上下文管理器只负责提交或回滚，需要显式关闭
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get_sync(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at and expires_at < now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def _set_sync(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        expires_at = now + ttl if ttl else 0
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at, now)
+            )
+            # 清理过期项并按最近访问时间淘汰超出容量的条目
+            conn.execute("DELETE FROM cache WHERE expires_at > 0 AND expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get_sync, key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        async with self._lock:
+            await asyncio.to_thread(self._set_sync, key, value, ttl)
+
+
+class RedisCacheTier:
+    """
+    基于 Redis 的共享缓存层，多个 worker 或实例共用
+    值为紧凑 JSON，超过 compress_min_bytes 时使用 zlib 压缩，首字节标记编码方式
+    连接失败后在 retry_interval 秒内不再访问 Redis，期间只使用本地缓存
+    """
+
+    def __init__(self, client: Any, prefix: str = "sumbot:cache:", ttl: float = 86400,
+                 compress_min_bytes: int = 1024, retry_interval: float = 30):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.compress_min_bytes = compress_min_bytes
+        self.retry_interval = retry_interval
+        self._unavailable_until = 0.0
+
+    def encode(self, value: Dict[str, Any]) -> bytes:
+        data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(data) >= self.compress_min_bytes:
+            return b"z" + zlib.compress(data, 6)
+        return b"j" + data
+
+    @staticmethod
+    def decode(data: bytes) -> Dict[str, Any]:
+        if data[:1] == b"z":
+            return json.loads(zlib.decompress(data[1:]))
+        return json.loads(data[1:])
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self, action: str, e: Exception) -> None:
+        # 只在进入不可用状态时输出一次警告
+        if self.available:
+            logger.warning(f"{action} Redis 缓存失败，{self.retry_interval}s 内仅使用本地缓存: {str(e)}")
+        self._unavailable_until = time.monotonic() + self.retry_interval
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.available:
+            return None
+        try:
+            data = await self.client.get(self.prefix + key)
+        except Exception as e:
+            self._mark_unavailable("读取", e)
+            return None
+        if data is None:
+            return None
+        try:
+            return self.decode(data)
+        except Exception as e:
+            logger.warning(f"解析 Redis 缓存值失败: {key}: {str(e)}")
+            return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not self.available:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            await self.client.set(self.prefix + key, self.encode(value), ex=int(ttl) if ttl else None)
+        except Exception as e:
+            self._mark_unavailable("写入", e)
+
+
+class SummaryCache:
+    """
+    多级总结缓存
+    - url:<规范化URL> -> 总结结果及内容哈希，命中时跳过抓取和模型调用
+    - content:<内容哈希> -> 总结结果，不同URL指向相同内容时跳过模型调用
+    - text:<规范化URL> -> 提取的正文，仅在启用 Redis 时缓存，总结失败重试或其他 worker 处理时跳过抓取
+    启用 Redis 时内存层作为短期近端缓存，查询顺序为内存、Redis、磁盘
+    """
+
+    def __init__(self):
+        cache_config = ConfigManager().get_cache_config()
+        self.enabled = cache_config.get('enabled', True)
+        self.memory = MemoryCacheTier(
+            max_entries=cache_config.get('memory_max_entries', 1024),
+            ttl=cache_config.get('memory_ttl', 3600)
+        )
+        self.disk = None
+        if self.enabled and cache_config.get('disk_enabled', True):
+            try:
+                self.disk = DiskCacheTier(
+                    path=cache_config.get('disk_path', 'output/cache/summary_cache.db'),
+                    max_entries=cache_config.get('disk_max_entries', 10000),
+                    ttl=cache_config.get('disk_ttl', 86400)
+                )
+            except Exception as e:
+                logger.error(f"初始化磁盘缓存失败，仅使用内存缓存: {str(e)}")
+        self.redis = None
+        if self.enabled and cache_config.get('redis_enabled', False):
+            client = get_redis_client()
+            if client is None:
+                logger.warning("未安装 redis，不使用 Redis 缓存")
+            else:
+                self.redis = RedisCacheTier(
+                    client,
+                    prefix=cache_config.get('redis_prefix', 'sumbot:cache:'),
+                    ttl=cache_config.get('redis_ttl', 86400),
+                    compress_min_bytes=cache_config.get('compress_min_bytes', 1024),
+                    retry_interval=cache_config.get('redis_retry_interval', 30)
+                )
+        # 启用 Redis 时内存层只短暂保留，使其他 worker 的更新尽快可见
+        self.near_ttl = cache_config.get('near_cache_ttl', 60) if self.redis else None
+        self.text_ttl = cache_config.get('text_ttl', 3600)
+        self.stats = {
+            'memory_hits': 0,
+            'redis_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+        }
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        return f"url:{canonicalize_url(url)}"
+
+    @staticmethod
+    def content_key(content_hash: str) -> str:
+        return f"content:{content_hash}"
+
+    @staticmethod
+    def text_key(url: str) -> str:
+        return f"text:{canonicalize_url(url)}"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        依次查询内存层、Redis 层和磁盘层，下层命中会回填上层
+        :param key: 缓存键
+        :return: 缓存值，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats['memory_hits'] += 1
+            return value
+
+        if self.redis:
+            value = await self.redis.get(key)
+            if value is not None:
+                self.stats['redis_hits'] += 1
+                self.memory.set(key, value, self.near_ttl)
+                return value
+
+        if self.disk:
+            try:
+                value = await self.disk.get(key)
+            except Exception as e:
+                logger.warning(f"读取磁盘缓存失败: {str(e)}")
+                value = None
+            if value is not None:
+                self.stats['disk_hits'] += 1
+                self.memory.set(key, value, self.near_ttl)
+                if self.redis:
+                    await self.redis.set(key, value)
+                return value
+
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        写入所有缓存层
+        :param key: 缓存键
+        :param value: 可JSON序列化的缓存值
+        """
+        if not self.enabled:
+            return
+
+        self.stats['sets'] += 1
+        self.memory.set(key, value, self.near_ttl)
+        if self.redis:
+            await self.redis.set(key, value)
+        if self.disk:
+            try:
+                await self.disk.set(key, value)
+            except Exception as e:
+                logger.warning(f"写入磁盘缓存失败: {str(e)}")
+
+    async def get_text(self, url: str) -> Optional[str]:
+        """
+        获取URL已提取的正文
+        :param url: 原始URL
+        :return: 正文，未命中返回 None
+        """
+        if not self.redis:
+            return None
+        key = self.text_key(url)
+        value = self.memory.get(key)
+        if value is None:
+            value = await self.redis.get(key)
+            if value is not None:
+                self.memory.set(key, value, self.near_ttl)
+        return value["text"] if value else None
+
+    async def set_text(self, url: str, text: str) -> None:
+        """
+        缓存URL提取的正文
+        :param url: 原始URL
+        :param text: 提取的正文
+        """
+        if not self.redis:
+            return
+        key = self.text_key(url)
+        value = {"text": text}
+        self.memory.set(key, value, min(self.near_ttl, self.text_ttl))
+        await self.redis.set(key, value, self.text_ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        hits = self.stats['memory_hits'] + self.stats['redis_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hits': hits,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'memory_entries': len(self.memory),
+            'redis_available': self.redis.available if self.redis else None,
+        }
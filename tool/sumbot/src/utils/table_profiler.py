@@ -0,0 +1,188 @@
+from datetime import date, datetime, time
+from typing import Any, List, Optional, Sequence
+import numpy as np
+
+
+def _is_null(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _format_number(value: float) -> str:
+    if np.isnan(value):
+        return "-"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return f"{value:.4g}"
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return _format_number(value)
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+
+def _detect_header(first_row: Sequence[Any]) -> bool:
+    """首行全部非空单元格都是文本时视为表头"""
+    values = [v for v in first_row if not _is_null(v)]
+    return bool(values) and all(isinstance(v, str) for v in values)
+
+
+# 按类型而不是逐个单元格分类，一列中通常只有少数几种类型
+_type_of = np.frompyfunc(type, 1, 1)
+
+
+def _type_kind(value_type: type) -> str:
+    if issubclass(value_type, (bool, np.bool_)):
+        return "布尔"
+    if issubclass(value_type, (int, float, np.integer, np.floating)):
+        return "数值"
+    if issubclass(value_type, (datetime, date, time)):
+        return "日期"
+    return "文本"
+
+
+def _column_kind(types: set) -> str:
+    """
+    推断列类型
+    :param types: 该列非空值的类型集合
+    """
+    kinds = {_type_kind(t) for t in types}
+    if not kinds:
+        return "空"
+    if len(kinds) == 1:
+        return kinds.pop()
+    return "混合(" + "/".join(sorted(kinds)) + ")"
+
+
+def _type_mask(types: np.ndarray, matched: set) -> np.ndarray:
+    mask = np.zeros(len(types), dtype=bool)
+    for value_type in matched:
+        mask |= types == value_type
+    return mask
+
+
+def profile_column(name: str, column: np.ndarray, top_k: int = 5) -> str:
+    """
+    生成单列的概要描述
+    整列按类型一次性转换为浮点数组（非数值为 NaN）和字符串数组，统计由 NumPy 完成
+    :param name: 列名
+    :param column: 该列所有值（object 数组）
+    :param top_k: 文本列输出的高频取值数量
+    """
+    total = len(column)
+    types = _type_of(column) if total else np.empty(0, dtype=object)
+    present = set(types.tolist())
+    kinds = {t: _type_kind(t) for t in present if t is not type(None)}
+
+    null_mask = types == type(None)
+    str_types = {t for t in present if issubclass(t, str)}
+    labels: List[np.ndarray] = []
+    label_counts: List[np.ndarray] = []
+    if str_types:
+        str_mask = _type_mask(types, str_types)
+        strings = column[str_mask].astype(str)
+        blank = np.char.str_len(np.char.strip(strings)) == 0
+        null_mask[str_mask] = blank
+        if not blank.all():
+            uniques, counts = np.unique(strings[~blank], return_counts=True)
+            labels.append(np.char.replace(np.char.replace(uniques, "\t", " "), "\n", " "))
+            label_counts.append(counts)
+    null_rate = float(null_mask.mean()) if total else 0.0
+
+    valid_types = set(types[~null_mask].tolist()) if str_types else set(kinds)
+    parts = [f"列 {name}: 类型 {_column_kind(valid_types)}", f"空值率 {null_rate:.1%}"]
+
+    numeric_types = {t for t, kind in kinds.items() if kind == "数值"}
+    if numeric_types:
+        numeric_mask = _type_mask(types, numeric_types)
+        numbers = np.full(total, np.nan)
+        numbers[numeric_mask] = column[numeric_mask].astype(float)
+        if not np.isnan(numbers).all():
+            p25, median, p75 = np.nanpercentile(numbers, [25, 50, 75])
+            parts.append(
+                "数值统计 "
+                f"均值 {_format_number(np.nanmean(numbers))}, 标准差 {_format_number(np.nanstd(numbers))}, "
+                f"最小 {_format_number(np.nanmin(numbers))}, P25 {_format_number(p25)}, "
+                f"中位数 {_format_number(median)}, P75 {_format_number(p75)}, "
+                f"最大 {_format_number(np.nanmax(numbers))}"
+            )
+
+    # 日期、布尔等其他类型先在同类型内去重，只格式化不同的取值
+    for value_type in set(kinds) - str_types - numeric_types:
+        group = column[types == value_type]
+        try:
+            uniques, counts = np.unique(group, return_counts=True)
+        except TypeError:
+            # 取值之间不能比较大小时按格式化后的文本去重
+            uniques, counts = np.unique(group.astype(str), return_counts=True)
+        labels.append(np.array([_format_cell(v) for v in uniques], dtype=str))
+        label_counts.append(counts)
+
+    if labels:
+        uniques, inverse = np.unique(np.concatenate(labels), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate(label_counts)).astype(int)
+        order = np.argsort(-counts, kind="stable")[:top_k]
+        top = ", ".join(f"{uniques[i]}({counts[i]})" for i in order)
+        parts.append(f"不同取值 {len(uniques)} 个，高频取值 {top}")
+
+    return "；".join(parts)
+
+
+def profile_table(
+    rows: List[Sequence[Any]],
+    title: str,
+    top_k: int = 5,
+    sample_rows: int = 5,
+    max_columns: int = 50,
+    total_rows: Optional[int] = None
+) -> List[str]:
+    """
+    把表格压缩为列级概要和少量样本行
+    :param rows: 行数据（可能只是前若干行）
+    :param title: 工作表名称
+    :param top_k: 文本列输出的高频取值数量
+    :param sample_rows: 样本行数量
+    :param max_columns: 最多分析的列数
+    :param total_rows: 工作表实际总行数，大于 len(rows) 时说明只分析了部分行
+    :return: 概要文本行列表
+    """
+    if not rows:
+        return [f"Sheet: {title}（空表）"]
+
+    header = None
+    if _detect_header(rows[0]):
+        header = [_format_cell(v) or f"列{i + 1}" for i, v in enumerate(rows[0])]
+        rows = rows[1:]
+
+    lengths = np.fromiter(map(len, rows), dtype=np.intp, count=len(rows))
+    width = max(int(lengths.max()) if len(rows) else 0, len(header or []))
+    shown_width = min(width, max_columns)
+    names = (header or []) + [f"列{i + 1}" for i in range(len(header or []), width)]
+
+    table = np.full((len(rows), width), None, dtype=object)
+    if len(rows) and (lengths == width).all():
+        table[:] = rows
+    else:
+        for i, row in enumerate(rows):
+            table[i, :len(row)] = row
+
+    total = total_rows - (1 if header else 0) if total_rows is not None else len(rows)
+    summary = f"Sheet: {title}（{total} 行 × {width} 列"
+    if total > len(rows):
+        summary += f"，以下统计基于前 {len(rows)} 行"
+    if width > shown_width:
+        summary += f"，仅分析前 {shown_width} 列"
+    lines = [summary + "）"]
+
+    for col in range(shown_width):
+        lines.append(profile_column(names[col], table[:, col], top_k))
+
+    if len(rows) and sample_rows > 0:
+        indices = np.unique(np.linspace(0, len(rows) - 1, num=min(sample_rows, len(rows))).astype(int))
+        lines.append("样本行:")
+        lines.append("\t".join(names[:shown_width]))
+        for index in indices:
+            lines.append("\t".join(_format_cell(v) for v in table[index, :shown_width]))
+    return lines
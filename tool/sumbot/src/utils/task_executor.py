@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+from fastapi import HTTPException
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+
+logger = get_logger("sumbot.task_executor")
+
+
+class TaskExecutor:
+    """
+    事件循环之外的任务执行器
+    - 进程池：大文件的文档解析（PyMuPDF、python-docx、openpyxl、python-pptx）
+    - 线程池：HTML解析及小文件解析
+    超出队列深度时直接拒绝，避免积压；单个任务有超时限制
+    """
+
+    def __init__(self):
+        executor_config = ConfigManager().get_executor_config()
+        self.process_workers = executor_config.get('process_workers', 2)
+        self.thread_workers = executor_config.get('thread_workers', 8)
+        self.process_threshold = int(executor_config.get('process_threshold_kb', 1024) * 1024)
+        self.task_timeout = executor_config.get('task_timeout', 120)
+        self.max_queue_depth = executor_config.get('max_queue_depth', 64)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # 服务进程内已有线程，使用 spawn 避免 fork 带来的锁状态问题
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._process_pool
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="sumbot-worker"
+            )
+        return self._thread_pool
+
+    async def _submit(self, pool: Executor, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        if self._pending >= self.max_queue_depth:
+            logger.warning(f"任务队列已满: {self._pending}/{self.max_queue_depth}")
+            raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+
+        self._pending += 1
+        try:
+            future = asyncio.get_running_loop().run_in_executor(pool, partial(func, *args))
+            return await asyncio.wait_for(future, timeout or self.task_timeout)
+        except asyncio.TimeoutError:
+            # 已开始执行的任务无法强制中断，只是不再等待其结果
+            logger.error(f"任务执行超时: {getattr(func, '__name__', func)}")
+            raise HTTPException(status_code=504, detail="任务处理超时")
+        finally:
+            self._pending -= 1
+
+    async def run_cpu_bound(self, func: Callable, *args, size: int = 0, timeout: Optional[float] = None) -> Any:
+        """
+        按输入大小分派CPU密集任务：达到阈值的进入进程池，其余进入线程池
+        进入进程池的 func 和参数必须可被 pickle
+        :param func: 要执行的函数
+        :param size: 输入大小（字节）
+        :param timeout: 超时秒数，不指定时使用配置值
+        """
+        if self.process_workers > 0 and size >= self.process_threshold:
+            return await self._submit(self._get_process_pool(), func, *args, timeout=timeout)
+        return await self._submit(self._get_thread_pool(), func, *args, timeout=timeout)
+
+    async def run_in_thread(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        在线程池中执行任务
+        :param func: 要执行的函数
+        :param timeout: 超时秒数，不指定时使用配置值
+        """
+        return await self._submit(self._get_thread_pool(), func, *args, timeout=timeout)
+
+    @property
+    def pending(self) -> int:
+        """正在排队或执行的任务数"""
+        return self._pending
+
+    def shutdown(self) -> None:
+        """关闭进程池和线程池"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        logger.info("任务执行器已关闭")
+
+
+# 进程级共享执行器
+task_executor = TaskExecutor()
@@ -0,0 +1,108 @@
+import re
+from typing import List, Tuple
+
+# 句末标点（含中文标点），可跟随右引号/右括号
+SENTENCE_PATTERN = re.compile(r'.*?(?:[。！？!?；;…]+[”’"\'）)】」』]*|\.(?=\s)|$)\s*', re.S)
+PARAGRAPH_PATTERN = re.compile(r'\n\s*\n|\n')
+# 中日韩字符大致每字一个 token
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中日韩字符每字约1个，其余字符约每4个1个"""
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_sentences(paragraph: str) -> List[str]:
+    """按中英文句末标点切分句子，保留标点"""
+    sentences = [s for s in SENTENCE_PATTERN.findall(paragraph) if s.strip()]
+    return sentences or [paragraph]
+
+
+def _hard_split(text: str, chunk_size: int) -> List[str]:
+    """没有可用边界时按长度硬切"""
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def _split_units(text: str, chunk_size: int) -> List[str]:
+    """
+    把文本拆成不超过 chunk_size 的最小单元
+    优先以段落为单元，段落过长时按句子，句子过长时按长度
+    """
+    units = []
+    for paragraph in PARAGRAPH_PATTERN.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= chunk_size:
+            units.append(paragraph + "\n")
+            continue
+        sentences = split_sentences(paragraph)
+        for sentence in sentences:
+            if len(sentence) <= chunk_size:
+                units.append(sentence)
+            else:
+                units.extend(_hard_split(sentence, chunk_size))
+        units[-1] = units[-1].rstrip() + "\n"
+    return units
+
+
+def _overlap_tail(chunk: str, overlap: int) -> str:
+    """取上一块末尾不超过 overlap 个字符的完整句子作为重叠部分"""
+    if overlap <= 0:
+        return ""
+    tail = []
+    size = 0
+    for sentence in reversed(split_sentences(chunk)):
+        if size + len(sentence) > overlap:
+            break
+        tail.insert(0, sentence)
+        size += len(sentence)
+    return "".join(tail)
+
+
+def _take_prefix(unit: str, room: int) -> Tuple[str, str]:
+    """
+    从单元开头取出不超过 room 个字符，优先取完整句子，一个完整句子都放不下时按长度切
+    :return: (取出的部分, 剩余部分)
+    """
+    size = 0
+    for sentence in split_sentences(unit):
+        if size + len(sentence) > room:
+            break
+        size += len(sentence)
+    if size == 0:
+        size = room
+    return unit[:size], unit[size:]
+
+
+def split_text(text: str, chunk_size: int = 6000, overlap: int = 200) -> List[str]:
+    """
+    按段落和句子边界把长文本切成块
+    当前块不足 chunk_size 的四分之一而下一个单元放不下时，拆开下一个单元填满当前块，
+    避免短段落单独成块，每个块都要一次模型调用
+    :param text: 原始文本
+    :param chunk_size: 每块最大字符数
+    :param overlap: 相邻块之间的重叠字符数
+    :return: 文本块列表
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size 必须大于0")
+    overlap = max(0, min(overlap, chunk_size // 2))
+    min_chunk_size = chunk_size // 4
+
+    chunks = []
+    current = ""
+    for unit in _split_units(text, chunk_size):
+        if current and len(current) + len(unit) > chunk_size:
+            if len(current.strip()) < min_chunk_size:
+                head, unit = _take_prefix(unit, chunk_size - len(current))
+                current += head
+            chunks.append(current.strip())
+            tail = _overlap_tail(current, overlap)
+            current = tail if len(tail) + len(unit) <= chunk_size else ""
+        current += unit
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
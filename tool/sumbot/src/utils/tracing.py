@@ -0,0 +1,182 @@
+import re
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from src.utils.config_manager import ConfigManager
+
+# 允许沿用客户端传入的请求ID，但限制字符和长度
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._\-]{1,64}$')
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("sumbot_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("sumbot_span", default=None)
+
+
+class Span:
+    """一个计时阶段，子阶段按开始顺序记录"""
+
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return (self.end - self.start) * 1000
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": None if self.end is None else round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+class Trace:
+    """一次请求的阶段树"""
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.timestamp = time.time()
+        self.status: Optional[int] = None
+        self.root = Span("request")
+
+    def server_timing(self) -> str:
+        """
+        生成 Server-Timing 头：同名阶段的耗时累加，并发阶段的累加值可能超过总耗时
+        只包含响应头发出前已结束的阶段
+        """
+        totals: Dict[str, float] = {}
+        stack = list(reversed(self.root.children))
+        while stack:
+            span = stack.pop()
+            if span.end is not None:
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration_ms
+            stack.extend(reversed(span.children))
+        parts = [f"{name};dur={duration:.1f}" for name, duration in totals.items()]
+        total = self.root.duration_ms
+        if total is None:
+            total = (time.perf_counter() - self.root.start) * 1000
+        parts.append(f"total;dur={total:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "timestamp": self.timestamp,
+            "status": self.status,
+            "duration_ms": None if self.root.end is None else round(self.root.duration_ms, 3),
+            "spans": self.root.to_dict(self.root.start)["children"],
+        }
+
+
+class _SpanScope:
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.span: Optional[Span] = None
+        self.parent: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        self.parent = _current_span.get()
+        if self.parent is None:
+            return None
+        self.span = Span(self.name, self.attrs)
+        self.parent.children.append(self.span)
+        _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        # 不使用 reset 令牌：异步生成器可能在其他上下文中被关闭
+        _current_span.set(self.parent)
+
+
+def span(name: str, **attrs) -> _SpanScope:
+    """
+    记录一个阶段的耗时，当前没有追踪上下文时不做任何事
+    :param name: 阶段名称（用于 Server-Timing，只能包含字母、数字和下划线）
+    :param attrs: 附加属性
+    """
+    return _SpanScope(name, attrs)
+
+
+def current_request_id() -> Optional[str]:
+    """当前请求的ID，不在请求上下文中时返回 None"""
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+class TraceStore:
+    """保存最近请求阶段树的环形缓冲区"""
+
+    def __init__(self):
+        tracing_config = ConfigManager().get_tracing_config()
+        self.enabled = tracing_config.get('enabled', True)
+        self.max_traces = tracing_config.get('buffer_size', 200)
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        # 进行中的请求，追踪对象释放后自动移除
+        self._active: "weakref.WeakValueDictionary[str, Trace]" = weakref.WeakValueDictionary()
+
+    def start(self, request_id: Optional[str], method: str, path: str) -> Trace:
+        """
+        开始追踪一个请求，并设置为当前上下文的追踪
+        :param request_id: 客户端传入的请求ID，无效或与已有追踪重复时重新生成，避免覆盖其他请求的记录
+        """
+        if not request_id or not REQUEST_ID_PATTERN.match(request_id) or \
+                request_id in self._traces or request_id in self._active:
+            request_id = uuid.uuid4().hex
+        trace = Trace(request_id, method, path)
+        self._active[request_id] = trace
+        _current_trace.set(trace)
+        _current_span.set(trace.root)
+        return trace
+
+    def finish(self, trace: Trace, status: Optional[int]) -> None:
+        """结束请求追踪并放入缓冲区"""
+        trace.root.end = time.perf_counter()
+        trace.status = status
+        self._traces[trace.request_id] = trace
+        self._traces.move_to_end(trace.request_id)
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+
+    def get(self, request_id: str) -> Optional[Trace]:
+        return self._traces.get(request_id)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近的请求概要，按时间倒序"""
+        traces = list(self._traces.values())[-limit:]
+        return [
+            {
+                "request_id": trace.request_id,
+                "method": trace.method,
+                "path": trace.path,
+                "timestamp": trace.timestamp,
+                "status": trace.status,
+                "duration_ms": None if trace.root.end is None else round(trace.root.duration_ms, 3),
+            }
+            for trace in reversed(traces)
+        ]
+
+
+# 进程级追踪缓冲区
+trace_store = TraceStore()
@@ -0,0 +1,222 @@
+import codecs
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, NamedTuple, Optional, Tuple
+import aiofiles
+from fastapi import HTTPException, Request, UploadFile
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+
+try:
+    try:
+        import python_multipart as multipart
+        from python_multipart.multipart import parse_options_header
+    except ModuleNotFoundError:
+        import multipart
+        from multipart.multipart import parse_options_header
+except ModuleNotFoundError:
+    multipart = None
+    parse_options_header = None
+
+logger = get_logger("sumbot.upload_handler")
+
+# 请求体中除文件内容外的边界、分段头和其他表单字段允许占用的字节数
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class SpooledUpload(NamedTuple):
+    """暂存到临时文件的上传文件"""
+    path: str
+    filename: Optional[str]
+
+
+def _upload_limits() -> Tuple[float, int, int, Optional[str]]:
+    upload_config = ConfigManager().get_upload_config()
+    max_size_mb = upload_config.get('max_size_mb', 50)
+    return (
+        max_size_mb,
+        int(max_size_mb * 1024 * 1024),
+        upload_config.get('chunk_size', 1024 * 1024),
+        upload_config.get('temp_dir') or None
+    )
+
+
+def _too_large(max_size_mb: float) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"文件大小超过限制: {max_size_mb}MB")
+
+
+def _create_temp_file(filename: Optional[str], temp_dir: Optional[str]) -> str:
+    if temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+    suffix = os.path.splitext(filename or '')[1].lower()
+    fd, temp_path = tempfile.mkstemp(prefix="sumbot_upload_", suffix=suffix, dir=temp_dir)
+    os.close(fd)
+    return temp_path
+
+
+def _remove(path: Optional[str]) -> None:
+    if path is None:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@asynccontextmanager
+async def spool_upload(file: UploadFile) -> AsyncIterator[SpooledUpload]:
+    """
+    把已解析的 UploadFile 按固定大小分块写入临时文件，退出时删除
+    供直接传入 UploadFile 的调用方使用；HTTP 上传使用 spool_request_upload，避免 Starlette 先暂存一份
+    :param file: 上传的文件
+    :return: 暂存的上传文件
+    :raises: HTTPException 413 如果文件超过大小限制
+    """
+    max_size_mb, max_size, chunk_size, temp_dir = _upload_limits()
+
+    # 已知大小时直接拒绝，避免无谓的拷贝
+    if file.size is not None and file.size > max_size:
+        raise _too_large(max_size_mb)
+
+    temp_path = _create_temp_file(file.filename, temp_dir)
+    try:
+        size = 0
+        async with aiofiles.open(temp_path, mode='wb') as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(max_size_mb)
+                await f.write(chunk)
+        logger.info(f"上传文件已暂存: {file.filename}, {size} 字节")
+        yield SpooledUpload(temp_path, file.filename)
+    finally:
+        _remove(temp_path)
+        await file.close()
+
+
+class _MultipartFileReader:
+    """multipart 解析回调：只收集指定字段的文件内容，其他字段丢弃"""
+
+    def __init__(self, field_name: str, charset: str):
+        self.field_name = field_name
+        self.charset = charset
+        self.filename: Optional[str] = None
+        self.found = False
+        self.finished = False
+        self.pending: List[bytes] = []
+        self._in_target = False
+        self._disposition = b""
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._in_target = False
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode(self.charset, errors="replace")
+        # 只取第一个同名文件字段
+        if name == self.field_name and b"filename" in options and not self.found:
+            self.found = True
+            self._in_target = True
+            self.filename = options[b"filename"].decode(self.charset, errors="replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_target:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self._in_target:
+            self.finished = True
+            self._in_target = False
+
+
+@asynccontextmanager
+async def spool_request_upload(request: Request, field_name: str = "file") -> AsyncIterator[SpooledUpload]:
+    """
+    直接从请求体流式解析 multipart 上传，文件内容边接收边写入临时文件，只写一次，退出时删除
+    Content-Length 超过限制时在读取请求体之前拒绝，未声明长度时接收过程中超限立即拒绝
+    :param request: 当前请求
+    :param field_name: 文件所在的表单字段名
+    :return: 暂存的上传文件
+    :raises: HTTPException 413 如果文件超过大小限制，400/422 如果请求格式错误或缺少文件
+    """
+    max_size_mb, max_size, _, temp_dir = _upload_limits()
+    max_body = max_size + MULTIPART_OVERHEAD
+
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise _too_large(max_size_mb)
+
+    content_type, params = parse_options_header(request.headers.get('content-type', ''))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="请求必须为 multipart/form-data 格式")
+    charset = params.get(b"charset", b"utf-8").decode('latin-1')
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = 'latin-1'
+
+    reader = _MultipartFileReader(field_name, charset)
+    parser = multipart.MultipartParser(boundary, reader.callbacks(), max_size=max_body)
+    temp_path: Optional[str] = None
+    f = None
+    try:
+        body_size = 0
+        file_size = 0
+        async for chunk in request.stream():
+            body_size += len(chunk)
+            if body_size > max_body:
+                raise _too_large(max_size_mb)
+            try:
+                parser.write(chunk)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"无法解析上传内容: {str(e)}")
+            if reader.found and f is None:
+                temp_path = _create_temp_file(reader.filename, temp_dir)
+                f = await aiofiles.open(temp_path, mode='wb')
+            for data in reader.pending:
+                file_size += len(data)
+                if file_size > max_size:
+                    raise _too_large(max_size_mb)
+                await f.write(data)
+            reader.pending.clear()
+        if not reader.finished:
+            raise HTTPException(status_code=422, detail=f"缺少上传文件字段: {field_name}")
+        await f.close()
+        f = None
+        logger.info(f"上传文件已暂存: {reader.filename}, {file_size} 字节")
+        yield SpooledUpload(temp_path, reader.filename)
+    finally:
+        if f is not None:
+            await f.close()
+        _remove(temp_path)
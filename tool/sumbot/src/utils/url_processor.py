@@ -1,161 +1,204 @@
-import aiohttp
-from bs4 import BeautifulSoup
+import asyncio
+import codecs
+import re
+import time
+from typing import Optional
 from fastapi import HTTPException
-import aiofiles
-from datetime import datetime
-import os
+from src.utils.http_client import get_http_session
+from src.utils.task_executor import task_executor
+from src.utils.html_extractor import get_html_extractor
+from src.utils.config_manager import ConfigManager
+from src.utils.logger import get_logger
+from src.utils.tracing import span, current_request_id
+from src.utils.history_store import history_store
+from src.utils.metrics import URL_FETCH_SECONDS, EXTRACTION_SECONDS, CONTENT_LENGTH, ERRORS
+
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
+
+logger = get_logger("sumbot.url_processor")
+
+# 下载页面时每次读取的字节数
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.I)
+
+# 国标编码统一按超集 GB18030 解码
+CHARSET_ALIASES = {
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'x-gbk': 'gb18030',
+}
+
+def _normalize_charset(charset: Optional[str]) -> Optional[str]:
+    """规范化编码名称，无法识别的编码返回 None"""
+    if not charset:
+        return None
+    charset = CHARSET_ALIASES.get(charset.strip().lower(), charset.strip().lower())
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+def detect_charset(body: bytes, header_charset: Optional[str] = None) -> str:
+    """
+    检测页面编码，依次使用响应头、meta 标签和字节特征
+    :param body: 页面原始字节
+    :param header_charset: Content-Type 中声明的编码
+    :return: 编码名称
+    """
+    charset = _normalize_charset(header_charset)
+    if charset:
+        return charset
+    
+    match = META_CHARSET_PATTERN.search(body[:4096])
+    if match:
+        charset = _normalize_charset(match.group(1).decode('ascii', errors='ignore'))
+        if charset:
+            return charset
+    
+    if body.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if body.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        body.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    
+    if charset_normalizer is not None:
+        best = charset_normalizer.from_bytes(body[:65536]).best()
+        charset = _normalize_charset(best.encoding) if best else None
+        if charset:
+            return charset
+    return 'gb18030'
+
+def truncate_html(body: bytes) -> bytes:
+    """在最后一个标签开始处截断，避免留下半个标签或半个多字节字符"""
+    boundary = body.rfind(b'<')
+    return body[:boundary] if boundary > 0 else body
 
 class URLProcessor:
     def __init__(self):
-        self.history_dir = "output/urlhistory"
-        os.makedirs(self.history_dir, exist_ok=True)
+        config = ConfigManager()
+        html_config = config.get_html_extractor_config()
+        self.html_extractor = get_html_extractor(html_config.get('backend', 'bs4'))
+        http_config = config.get_http_client_config()
+        self.max_page_bytes = int(http_config.get('max_page_mb', 5) * 1024 * 1024)
+        self.max_content_length = int(http_config.get('max_content_length_mb', 50) * 1024 * 1024)
 
-    async def record_url_history(self, url: str, tags: list = None) -> None:
+    async def record_url_history(
+        self,
+        url: str,
+        tags: list = None,
+        latency_ms: Optional[float] = None,
+        summary_id: Optional[str] = None,
+        status: str = "success"
+    ) -> None:
         """
         记录URL处理历史
+        只放入历史存储的写入队列，不等待落盘
         """
-        current_date = datetime.now().strftime("%Y%m%d")
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        history_file = os.path.join(self.history_dir, f"{current_date}.md")
-        
-        # 准备记录内容
-        tags_str = " ".join([f"#{tag}" for tag in (tags or [])])
-        record = f"\n- {url} | {current_time} | {tags_str}"
-        
-        # 写入历史记录
-        async with aiofiles.open(history_file, mode='a', encoding='utf-8') as f:
-            await f.write(record)
+        history_store.record(url, tags, latency_ms, summary_id, status, current_request_id())
 
     async def get_url_content(self, url: str, tags: list = None) -> str:
         """
-        获取URL内容并记录历史
+        获取URL内容
+        历史记录由调用方在处理完成后写入，包含耗时和总结ID
         """
         try:
-            # 记录URL历史
-            await self.record_url_history(url, tags)
-            
-            async with aiohttp.ClientSession() as session:
-                try:
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                    }
-                    async with session.get(url, headers=headers) as response:
-                        if response.status != 200:
-                            raise HTTPException(
-                                status_code=400,
-                                detail=f"无法访问 URL: HTTP {response.status}"
-                            )
-                        
-                        content = await response.text()
-                        
-                        # 解析 HTML 内容
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # 处理微信公众号文章
-                        if 'mp.weixin.qq.com' in url:
-                            return await self._process_wechat_article(soup)
-                        else:
-                            # 处理其他网页
-                            return await self._process_general_webpage(soup)
-                except Exception as e:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"处理 URL 时出错: {str(e)}"
-                    )
+            html = await self.fetch_html(url)
+            return await self.extract_text(html, url)
+        except HTTPException:
+            # 保留下载和解析阶段给出的状态码（如线程池繁忙 503、解析超时 504）
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=400,
-                detail=f"记录 URL 历史时出错: {str(e)}"
+                detail=f"获取 URL 内容时出错: {str(e)}"
             )
 
-    async def _process_wechat_article(self, soup: BeautifulSoup) -> str:
+    async def fetch_html(self, url: str) -> str:
+        """
+        下载页面HTML
+        按块读取，超过大小上限时截断到标签边界；声明的长度过大时直接放弃
+        """
+        with span("fetch", url=url):
+            session = get_http_session()
+            start = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"无法访问 URL: HTTP {response.status}"
+                        )
+                    
+                    if response.content_length and response.content_length > self.max_content_length:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"页面过大: {response.content_length} 字节"
+                        )
+                    
+                    chunks = []
+                    size = 0
+                    truncated = False
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size > self.max_page_bytes:
+                            truncated = True
+                            break
+                    body = b"".join(chunks)
+                    header_charset = response.charset
+                
+                URL_FETCH_SECONDS.observe(time.perf_counter() - start)
+                
+                if truncated:
+                    body = truncate_html(body[:self.max_page_bytes])
+                    logger.warning(f"页面超过 {self.max_page_bytes} 字节，已截断: {url}")
+                
+                return body.decode(detect_charset(body, header_charset), errors='replace')
+            except HTTPException:
+                ERRORS.inc(stage="fetch")
+                raise
+            except asyncio.TimeoutError:
+                ERRORS.inc(stage="fetch")
+                raise HTTPException(
+                    status_code=400,
+                    detail="处理 URL 时出错: 请求超时"
+                )
+            except Exception as e:
+                ERRORS.inc(stage="fetch")
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"处理 URL 时出错: {str(e)}"
+                )
+
+    async def extract_text(self, html: str, url: str) -> str:
         """
-        处理微信公众号文章
+        从页面HTML中提取正文，解析在线程池中进行，不阻塞事件循环
         """
-        article_content = []
-        
-        # 获取标题（尝试多个可能的选择器）
-        title = (
-            soup.find('h1', class_='rich_media_title') or
-            soup.find('h1', id='activity-name') or
-            soup.find('h1')
-        )
-        if title:
-            article_content.append(f"标题：{title.get_text().strip()}")
-        
-        # 获取作者信息（尝试多个可能的选择器）
-        author = (
-            soup.find('a', class_='rich_media_meta rich_media_meta_link rich_media_meta_nickname') or
-            soup.find('span', class_='rich_media_meta_text') or
-            soup.find('a', id='js_name')
-        )
-        if author:
-            article_content.append(f"作者：{author.get_text().strip()}")
-        
-        # 获取文章内容（尝试多个可能的选择器）
-        article = (
-            soup.find('div', class_='rich_media_content') or
-            soup.find('div', id='js_content') or
-            soup.find('div', class_='content')
-        )
-        
-        if article:
-            # 移除所有脚本和样式
-            for element in article(['script', 'style']):
-                element.decompose()
-            
-            # 获取所有文本内容
-            paragraphs = article.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section'])
-            for p in paragraphs:
-                text = p.get_text().strip()
-                if text:  # 只添加非空文本
-                    article_content.append(text)
-            
-            # 如果没有找到段落，尝试直接获取文本
-            if not paragraphs:
-                text = article.get_text().strip()
-                if text:
-                    article_content.append(text)
-        
-        if not article_content:
-            # 如果仍然没有内容，尝试获取页面上的所有文本
-            texts = soup.stripped_strings
-            article_content = [text.strip() for text in texts if text.strip()]
-        
-        if not article_content:
+        try:
+            with span("extract", source="html"), EXTRACTION_SECONDS.time(source="html"):
+                content = await task_executor.run_in_thread(self._extract_text_sync, html, url)
+            CONTENT_LENGTH.observe(len(content), source="url")
+            return content
+        except HTTPException:
+            ERRORS.inc(stage="extract")
+            raise
+        except Exception as e:
+            ERRORS.inc(stage="extract")
             raise HTTPException(
                 status_code=400,
-                detail="无法提取文章内容"
+                detail=f"处理 URL 时出错: {str(e)}"
             )
-        
-        return "\n".join(article_content)
 
-    async def _process_general_webpage(self, soup: BeautifulSoup) -> str:
+    def _extract_text_sync(self, html: str, url: str) -> str:
         """
-        处理一般网页
+        解析HTML并提取正文（同步执行）
         """
-        # 移除脚本和样式
-        for script in soup(['script', 'style']):
-            script.decompose()
-        
-        # 获取标题
-        title = soup.find('title')
-        content = []
-        if title:
-            content.append(f"标题：{title.get_text().strip()}")
-        
-        # 获取主要内容
-        main_content = soup.find('main') or soup.find('article') or soup.find('body')
-        if main_content:
-            # 获取所有段落文本
-            paragraphs = main_content.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            for p in paragraphs:
-                text = p.get_text().strip()
-                if text:  # 只添加非空文本
-                    content.append(text)
-        
-        if not content:
-            # 如果没有找到主要内容，则获取所有文本
-            content = [text.strip() for text in soup.stripped_strings]
-        
-        return "\n".join(content) 
\ No newline at end of file
+        return self.html_extractor.extract(html, url)
@@ -0,0 +1,56 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.v1.endpoints import history
+from src.utils.config_manager import ConfigManager
+
+ADMIN_TOKEN = "history-admin-token"
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(history.history_store, "query", lambda **kwargs: [])
+    app = FastAPI()
+    app.include_router(history.router)
+    return app
+
+
+def use_token(monkeypatch, token):
+    monkeypatch.setattr(ConfigManager, "get_history_config", lambda self: {"access_token": token})
+
+
+class TestHistoryAccess:
+    def test_query_rejects_remote_client_without_token(self, app, monkeypatch):
+        """
+        测试未配置令牌时远程客户端不能查询历史
+        """
+        use_token(monkeypatch, None)
+        response = TestClient(app, client=("203.0.113.7", 50000)).get("/api/v1/history")
+        assert response.status_code == 403
+
+    def test_query_allows_loopback_without_token(self, app, monkeypatch):
+        """
+        测试未配置令牌时本机可以查询历史
+        """
+        use_token(monkeypatch, None)
+        response = TestClient(app, client=("127.0.0.1", 50000)).get("/api/v1/history")
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_query_requires_configured_token(self, app, monkeypatch):
+        """
+        测试配置令牌后需要正确的 X-Admin-Token，本机也不例外
+        """
+        use_token(monkeypatch, ADMIN_TOKEN)
+        client = TestClient(app, client=("127.0.0.1", 50000))
+        assert client.get("/api/v1/history").status_code == 403
+        assert client.get("/api/v1/history", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.get("/api/v1/history", headers={"X-Admin-Token": ADMIN_TOKEN}).status_code == 200
+
+    def test_export_rejects_remote_client(self, app, monkeypatch):
+        """
+        测试导出端点使用相同的访问控制
+        """
+        use_token(monkeypatch, None)
+        response = TestClient(app, client=("203.0.113.7", 50000)).post("/api/v1/history/export")
+        assert response.status_code == 403
@@ -0,0 +1,21 @@
+import asyncio
+from src.utils.ai_client_registry import AIClientRegistry
+
+
+class TestAIClientRegistry:
+    def test_client_recreated_for_new_event_loop(self):
+        """
+        测试事件循环更换后不复用绑定在旧循环上的客户端
+        """
+        registry = AIClientRegistry()
+
+        async def get_twice():
+            first = registry.get("svc", "http://127.0.0.1:1/v1", "sk-test")
+            assert registry.get("svc", "http://127.0.0.1:1/v1", "sk-test") is first
+            return first
+
+        first = asyncio.run(get_twice())
+        second = asyncio.run(get_twice())
+        assert second is not first
+        assert len(registry) == 1
+        asyncio.run(registry.close_all())
@@ -0,0 +1,116 @@
+import pytest
+from src.utils.html_extractor import BeautifulSoupExtractor, HTMLExtractor, get_html_extractor
+
+lxml = pytest.importorskip("lxml")
+
+GENERAL_URL = "https://example.com/page"
+WECHAT_URL = "https://mp.weixin.qq.com/s/abc"
+
+# 结构完整的页面：两个后端的提取结果必须一致
+CORPUS = {
+    "general_main": (GENERAL_URL, (
+        "<html><head><title> 一般页面 </title><style>p{}</style></head><body><nav><p>导航</p></nav>"
+        "<main><h1>主标题</h1><p>正文一</p><div><p>嵌套<em>强调</em>正文</p></div><h3></h3></main>"
+        "<footer><p>页脚</p></footer></body></html>"
+    )),
+    "general_article": (GENERAL_URL, (
+        "<html><head><title>Article</title></head><body><article><h2>Sub</h2>"
+        "<p>Para &lt;1&gt; &copy; 2024</p></article><script>x()</script></body></html>"
+    )),
+    "general_no_paragraphs": (GENERAL_URL, (
+        "<html><head><title>NoParas</title></head><body><div>Just <span>text</span> here</div>"
+        "<!-- hidden --></body></html>"
+    )),
+    "general_text_only": (GENERAL_URL, "<html><body><div>text only <b>bold</b></div>tail text</body></html>"),
+    "general_mixed_blocks": (GENERAL_URL, (
+        "<html><body><p>One</p><p>Two <br> lines</p><ul><li>li item</li></ul><h4>H4</h4></body></html>"
+    )),
+    "general_raw_text_tags": (GENERAL_URL, (
+        "<html><body><div>a<template>tpl</template><noscript>ns</noscript><textarea>ta</textarea>b</div></body></html>"
+    )),
+    "wechat_full": (WECHAT_URL, (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>微信文章</title>'
+        '<script>var x="<p>bad</p>";</script></head>\n<body><h1 class="rich_media_title " id="activity-name">\n'
+        '  深度学习入门 &amp; 实践\n</h1>\n<div class="rich_media_meta_list">'
+        '<a class="rich_media_meta rich_media_meta_link rich_media_meta_nickname" id="js_name"> 机器之心 </a>\n'
+        '<span class="rich_media_meta_text">2024-01-01</span></div>\n'
+        '<div class="rich_media_content " id="js_content"><section><p>第一段&nbsp;内容<strong>加粗</strong>。</p>'
+        '<!-- 注释 --><p>第二段</p></section>\n<script>alert(1)</script><style>.a{}</style><h2>小标题</h2>'
+        '<p>   </p><p>尾段 <a href="#">链接</a> 结束</p></div></body></html>'
+    )),
+    "wechat_plain_text": (WECHAT_URL, (
+        '<html><body><div id="js_content">纯文本内容，无段落<br>第二行</div><h1>标题二</h1></body></html>'
+    )),
+    "wechat_fallback": (WECHAT_URL, (
+        '<html><head><title>空</title><script>var s=1</script></head><body><!-- c --><div>只有 <b>div</b></div>'
+        '<span class="rich_media_meta_text">作者X</span></body></html>'
+    )),
+}
+
+# 嵌套错误或缺少结束标签的页面：libxml2 按 HTML 规范修正结构，html.parser 保留原样，结果不同
+MALFORMED = {
+    "block_in_paragraph": "<html><body><p>a<div>b</div>c</p></body></html>",
+    "table_in_paragraph": "<html><body><p>intro<table><tr><td>cell</td></tr></table>outro</p></body></html>",
+    "unclosed_paragraphs": "<html><body><p>one<p>two<p>three</body></html>",
+    "missing_body": "<title>T</title><p>text</p>",
+}
+
+# 结构修正后两个后端仍然一致的情况
+MALFORMED_PARITY = {
+    "stray_end_tag": "<html><body><p>a</b>b</p></body></html>",
+    "unclosed_list_items": "<html><body><ul><li>x<li>y</ul><p>z</p></body></html>",
+}
+
+
+@pytest.fixture(scope="module")
+def backends():
+    return BeautifulSoupExtractor(), get_html_extractor("lxml")
+
+
+class TestHTMLExtractorParity:
+    @pytest.mark.parametrize("name", sorted(CORPUS))
+    def test_corpus_parity(self, backends, name):
+        """
+        测试结构完整的页面上两个后端的提取结果一致
+        """
+        url, html = CORPUS[name]
+        bs4_backend, lxml_backend = backends
+        assert lxml_backend.extract(html, url) == bs4_backend.extract(html, url)
+
+    @pytest.mark.parametrize("name", sorted(MALFORMED_PARITY))
+    def test_malformed_parity(self, backends, name):
+        """
+        测试不影响段落划分的标签错误上两个后端的提取结果一致
+        """
+        bs4_backend, lxml_backend = backends
+        html = MALFORMED_PARITY[name]
+        assert lxml_backend.extract(html, GENERAL_URL) == bs4_backend.extract(html, GENERAL_URL)
+
+    @pytest.mark.parametrize("name", sorted(MALFORMED))
+    @pytest.mark.xfail(strict=True, reason="lxml 修正嵌套后段落划分与 html.parser 不同，因此默认使用 bs4")
+    def test_malformed_divergence(self, backends, name):
+        """
+        记录嵌套错误的页面上两个后端的差异，差异消失时提醒重新评估默认后端
+        """
+        bs4_backend, lxml_backend = backends
+        html = MALFORMED[name]
+        assert lxml_backend.extract(html, GENERAL_URL) == bs4_backend.extract(html, GENERAL_URL)
+
+    def test_block_in_paragraph_keeps_text_with_default_backend(self):
+        """
+        测试默认后端不丢失段落内块级元素及其后的文本
+        """
+        assert get_html_extractor().extract(MALFORMED["block_in_paragraph"], GENERAL_URL) == "abc"
+
+
+class TestHTMLExtractorInterface:
+    def test_incomplete_backend_cannot_be_created(self):
+        """
+        测试未实现全部提取规则的后端在创建时即报错
+        """
+        class WechatOnlyExtractor(HTMLExtractor):
+            def extract_wechat(self, html: str) -> str:
+                return html
+
+        with pytest.raises(TypeError):
+            WechatOnlyExtractor()
@@ -0,0 +1,97 @@
+import pytest
+from starlette.requests import Request
+from src.utils.config_manager import ConfigSnapshot
+from src.utils.rate_limiter import RateLimiter
+
+PATH = "/api/v1/summarize/url"
+REGISTERED_KEY = "sk-registered-client"
+
+
+def make_request(headers=None, client_ip="10.0.0.1") -> Request:
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": PATH,
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": (client_ip, 12345),
+    })
+
+
+@pytest.fixture
+def limiter():
+    rate_limiter = RateLimiter()
+    rate_limiter._apply_config(ConfigSnapshot({
+        "rate_limit": {
+            "enabled": True,
+            "per_minute": 3,
+            "burst": 3,
+            "backend": "memory",
+            "api_keys": [REGISTERED_KEY],
+        }
+    }))
+    return rate_limiter
+
+
+class TestRateLimiter:
+    @pytest.mark.asyncio
+    async def test_rotating_unregistered_key_does_not_reset_bucket(self, limiter):
+        """
+        测试每次更换未登记的 API 密钥请求头仍按客户端IP计数
+        """
+        results = []
+        for i in range(5):
+            headers = {"X-API-Key": f"sk-random-{i}"} if i % 2 else {"Authorization": f"Bearer sk-random-{i}"}
+            allowed, _, _ = await limiter.check(make_request(headers))
+            results.append(allowed)
+        assert results == [True, True, True, False, False]
+
+    @pytest.mark.asyncio
+    async def test_registered_key_has_own_bucket(self, limiter):
+        """
+        测试登记过的密钥单独分桶，不受同一IP上其他请求的影响
+        """
+        for _ in range(3):
+            await limiter.check(make_request())
+        allowed, _, _ = await limiter.check(make_request())
+        assert not allowed
+
+        allowed, _, _ = await limiter.check(make_request({"X-API-Key": REGISTERED_KEY}))
+        assert allowed
+
+    def test_client_key_ignores_unregistered_key(self, limiter):
+        """
+        测试未登记的密钥按客户端IP分桶
+        """
+        assert limiter.client_key(make_request({"X-API-Key": "sk-unknown"})) == "ip:10.0.0.1"
+        assert limiter.client_key(make_request({"X-API-Key": REGISTERED_KEY})).startswith("key:")
+
+    def test_forwarded_for_only_when_trusted(self, limiter):
+        """
+        测试只有开启 trust_forwarded_for 时才使用 X-Forwarded-For
+        """
+        request = make_request({"X-Forwarded-For": "203.0.113.7, 10.0.0.1"})
+        assert limiter.client_key(request) == "ip:10.0.0.1"
+        limiter.trust_forwarded_for = True
+        assert limiter.client_key(request) == "ip:203.0.113.7"
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_backs_off(self, limiter):
+        """
+        测试 Redis 失败后在 redis_retry_interval 内不再访问 Redis，直接使用进程内令牌桶
+        """
+        class FailingBackend:
+            calls = 0
+
+            async def acquire(self, *args):
+                FailingBackend.calls += 1
+                raise ConnectionError("redis down")
+
+        limiter.redis = FailingBackend()
+        for _ in range(3):
+            allowed, _, _ = await limiter.check(make_request())
+            assert allowed
+        assert FailingBackend.calls == 1
+
+        limiter._redis_unavailable_until = 0.0
+        await limiter.check(make_request())
+        assert FailingBackend.calls == 2
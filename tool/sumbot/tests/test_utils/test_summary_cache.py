@@ -0,0 +1,130 @@
+import pytest
+from src.utils.config_manager import ConfigManager
+from src.utils.summary_cache import MemoryCacheTier, RedisCacheTier, SummaryCache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+SUMMARY = {"summary": "总结" * 10, "follow_up_questions": ["问题一", "问题二"]}
+
+
+class CountingClient:
+    """记录调用次数的 Redis 客户端包装"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    async def get(self, *args, **kwargs):
+        self.calls += 1
+        return await self.client.get(*args, **kwargs)
+
+    async def set(self, *args, **kwargs):
+        self.calls += 1
+        return await self.client.set(*args, **kwargs)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def client(server):
+    return fakeredis.aioredis.FakeRedis(server=server)
+
+
+class TestRedisCacheTier:
+    @pytest.mark.asyncio
+    async def test_round_trip_and_ttl(self, client):
+        """
+        测试写入后可读回，键带前缀并设置过期时间
+        """
+        tier = RedisCacheTier(client, prefix="test:", ttl=120)
+        await tier.set("url:a", SUMMARY)
+        assert await tier.get("url:a") == SUMMARY
+        assert await tier.get("url:missing") is None
+        assert 0 < await client.ttl("test:url:a") <= 120
+
+        await tier.set("url:b", SUMMARY, ttl=5)
+        assert 0 < await client.ttl("test:url:b") <= 5
+
+    @pytest.mark.asyncio
+    async def test_large_values_compressed(self, client):
+        """
+        测试超过 compress_min_bytes 的值压缩存储，小值保持 JSON
+        """
+        tier = RedisCacheTier(client, prefix="test:", compress_min_bytes=256)
+        large = {"summary": "重复内容" * 500}
+        await tier.set("big", large)
+        await tier.set("small", {"summary": "短"})
+
+        raw = await client.get("test:big")
+        assert raw[:1] == b"z"
+        assert len(raw) < len("重复内容".encode()) * 500
+        assert (await client.get("test:small"))[:1] == b"j"
+        assert await tier.get("big") == large
+        assert await tier.get("small") == {"summary": "短"}
+
+    @pytest.mark.asyncio
+    async def test_connection_error_backs_off(self, server, client):
+        """
+        测试连接失败后在 retry_interval 内不再访问 Redis
+        """
+        server.connected = False
+        counting = CountingClient(client)
+        tier = RedisCacheTier(counting, retry_interval=30)
+        assert await tier.get("url:a") is None
+        assert not tier.available
+        await tier.set("url:a", SUMMARY)
+        assert await tier.get("url:a") is None
+        assert counting.calls == 1
+
+        server.connected = True
+        tier._unavailable_until = 0.0
+        await tier.set("url:a", SUMMARY)
+        assert await tier.get("url:a") == SUMMARY
+
+
+class TestSummaryCacheRedisFallback:
+    @pytest.fixture
+    def cache(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(ConfigManager, "get_cache_config", lambda self: {
+            "enabled": True,
+            "disk_path": str(tmp_path / "cache.db"),
+        })
+        return SummaryCache()
+
+    @pytest.mark.asyncio
+    async def test_shared_tier_visible_across_instances(self, cache, client, monkeypatch, tmp_path):
+        """
+        测试两个实例通过 Redis 层共享缓存
+        """
+        cache.redis = RedisCacheTier(client)
+        await cache.set("url:a", SUMMARY)
+
+        monkeypatch.setattr(ConfigManager, "get_cache_config", lambda self: {
+            "enabled": True,
+            "disk_enabled": False,
+        })
+        other = SummaryCache()
+        other.redis = RedisCacheTier(client)
+        assert await other.get("url:a") == SUMMARY
+        assert other.stats["redis_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_tiers_when_redis_down(self, cache, server, client):
+        """
+        测试 Redis 连接失败时使用内存和磁盘层，并在退避期间跳过 Redis
+        """
+        server.connected = False
+        counting = CountingClient(client)
+        cache.redis = RedisCacheTier(counting, retry_interval=30)
+
+        await cache.set("url:a", SUMMARY)
+        assert counting.calls == 1
+
+        cache.memory = MemoryCacheTier(max_entries=16, ttl=60)
+        assert await cache.get("url:a") == SUMMARY
+        assert cache.stats["disk_hits"] == 1
+        assert await cache.get("url:missing") is None
+        assert counting.calls == 1
@@ -0,0 +1,27 @@
+from datetime import date
+import numpy as np
+from src.utils.table_profiler import profile_column, profile_table
+
+
+class TestTableProfiler:
+    def test_mixed_column(self):
+        """
+        测试混合类型列：空白文本计为空值，布尔值不参与数值统计，文本取值统一格式化后计数
+        """
+        column = np.array([1, 2.5, True, None, "  ", "a\tb", "a b", date(2024, 1, 2), float("nan")], dtype=object)
+        assert profile_column("n", column) == (
+            "列 n: 类型 混合(布尔/数值/文本/日期)；空值率 22.2%；"
+            "数值统计 均值 1.75, 标准差 0.75, 最小 1, P25 1.375, 中位数 1.75, P75 2.125, 最大 2.5；"
+            "不同取值 3 个，高频取值 a b(2), 2024-01-02(1), True(1)"
+        )
+
+    def test_empty_and_ragged_rows(self):
+        """
+        测试空列和长度不一的行
+        """
+        lines = profile_table([["a", "b"], [None], ["x", ""]], "s", sample_rows=0)
+        assert lines == [
+            "Sheet: s（2 行 × 2 列）",
+            "列 a: 类型 文本；空值率 50.0%；不同取值 1 个，高频取值 x(1)",
+            "列 b: 类型 空；空值率 100.0%",
+        ]
@@ -0,0 +1,33 @@
+from src.utils.text_splitter import split_text
+
+CHUNK_SIZE = 6000
+
+
+class TestSplitText:
+    def test_short_paragraph_before_unbroken_text_is_merged(self):
+        """
+        测试超长无标点段落前的短段落并入第一块，除最后一块外都接近 chunk_size
+        """
+        text = "短段落，只有十几个字。\n" + "x" * 20000
+        chunks = split_text(text, chunk_size=CHUNK_SIZE, overlap=200)
+        assert chunks[0].startswith("短段落")
+        assert all(len(chunk) >= CHUNK_SIZE // 4 for chunk in chunks[:-1])
+        assert all(len(chunk) <= CHUNK_SIZE for chunk in chunks)
+        assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+    def test_short_paragraph_before_long_paragraph_is_merged(self):
+        """
+        测试短段落后接一个放不下的长段落时按句子补满当前块
+        """
+        text = "短段落。\n" + "这是一句话。" * 999 + "\n" + "另一段。" * 10
+        chunks = split_text(text, chunk_size=CHUNK_SIZE, overlap=200)
+        assert all(len(chunk) >= CHUNK_SIZE // 4 for chunk in chunks[:-1])
+        assert all(chunk.endswith("。") for chunk in chunks)
+
+    def test_paragraphs_kept_whole_when_chunks_are_large_enough(self):
+        """
+        测试当前块足够大时仍按段落边界切分
+        """
+        paragraphs = ["甲" * 3000 + "。", "乙" * 3500 + "。", "丙" * 100 + "。"]
+        chunks = split_text("\n\n".join(paragraphs), chunk_size=CHUNK_SIZE, overlap=0)
+        assert chunks == [paragraphs[0], paragraphs[1] + "\n" + paragraphs[2]]
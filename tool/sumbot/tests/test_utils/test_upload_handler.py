@@ -0,0 +1,82 @@
+import os
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from src.utils.config_manager import ConfigManager
+from src.utils.upload_handler import MULTIPART_OVERHEAD, spool_request_upload
+
+MAX_SIZE = 1024
+
+
+@pytest.fixture(autouse=True)
+def small_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(ConfigManager, "get_upload_config", lambda self: {
+        "max_size_mb": MAX_SIZE / 1024 / 1024,
+        "temp_dir": str(tmp_path)
+    })
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        async with spool_request_upload(request) as (path, filename):
+            with open(path, 'rb') as f:
+                data = f.read()
+        return {"filename": filename, "size": len(data), "removed": not os.path.exists(path)}
+
+    return TestClient(app)
+
+
+class TestSpoolRequestUpload:
+    def test_streams_file_field(self, client, tmp_path):
+        """
+        测试文件字段写入临时文件，其他字段忽略，退出后删除临时文件
+        """
+        response = client.post(
+            "/upload",
+            data={"note": "x" * 100},
+            files={"file": ("a.txt", b"hello" * 100, "text/plain")}
+        )
+        assert response.status_code == 200
+        assert response.json() == {"filename": "a.txt", "size": 500, "removed": True}
+        assert list(tmp_path.iterdir()) == []
+
+    def test_oversized_file_rejected(self, client, tmp_path):
+        """
+        测试文件超过限制时返回 413 且不留下临时文件
+        """
+        response = client.post("/upload", files={"file": ("a.txt", b"x" * (MAX_SIZE + 1), "text/plain")})
+        assert response.status_code == 413
+        assert list(tmp_path.iterdir()) == []
+
+    def test_missing_file_field(self, client):
+        """
+        测试缺少文件字段时返回 422
+        """
+        response = client.post("/upload", files={"other": ("a.txt", b"x", "text/plain")})
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_content_length_rejected_before_reading_body(self):
+        """
+        测试 Content-Length 超过限制时不读取请求体直接返回 413
+        """
+        async def receive():
+            raise AssertionError("请求体不应被读取")
+
+        request = Request({
+            "type": "http",
+            "method": "POST",
+            "path": "/upload",
+            "headers": [
+                (b"content-type", b"multipart/form-data; boundary=xyz"),
+                (b"content-length", str(MAX_SIZE + MULTIPART_OVERHEAD + 1).encode()),
+            ],
+        }, receive)
+        with pytest.raises(HTTPException) as exc_info:
+            async with spool_request_upload(request):
+                pass
+        assert exc_info.value.status_code == 413